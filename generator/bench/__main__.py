@@ -0,0 +1,231 @@
+import argparse
+import cProfile
+import json
+import resource
+import shutil
+import subprocess
+import tempfile
+import time
+from collections import defaultdict
+from pathlib import Path
+
+from loguru import logger
+from rich.console import Console
+from rich.table import Table
+
+from src import html_to_mdx as html_converter
+from src.manifest import hash_files
+from src.mdx_converter import load_pages, render_page_files
+from src.schema import Page
+
+BENCH_DIR = Path(__file__).parent
+FIXTURE_JSON = BENCH_DIR / "fixtures" / "output.json"
+RECORD_SOURCE = Path("build") / "output.json"
+BODY_KINDS = ("html", "category", "symbols", "func", "group", "type")
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark the MDX generator stages against a recorded output.json")
+    parser.add_argument("--input", type=Path, default=FIXTURE_JSON, help="Recorded typst-docs JSON to benchmark against")
+    parser.add_argument("--record", action="store_true", help=f"Copy {RECORD_SOURCE} to {FIXTURE_JSON} and exit")
+    parser.add_argument("--repeat", type=int, default=1, help="Number of timed repetitions, the fastest one is reported")
+    parser.add_argument("--top", type=int, default=10, help="Number of slowest pages to report")
+    parser.add_argument("--html-parser", choices=html_converter.PARSER_BACKENDS, default="html.parser", help="Backend used to parse HTML fragments")
+    parser.add_argument("--highlight", choices=html_converter.HIGHLIGHT_MODES, default="shiki", help="Emit plain typst code blocks for the webapp to highlight with Shiki, or keep the typst-docs highlighting as pre-tokenized TypstCode components")
+    parser.add_argument("--warm-cache", action="store_true", help="Keep the fragment cache between repetitions")
+    parser.add_argument("--profile", choices=("cprofile", "pyinstrument"), help="Profile the conversion stage")
+    parser.add_argument("--profile-out", type=Path, default=Path("bench-profile"), help="Profile output path without extension")
+    parser.add_argument("--json", type=Path, help="Write the results to this JSON file")
+    parser.add_argument("--baseline", type=Path, help="Results JSON of an earlier run to compare stage times against")
+    return parser.parse_args()
+
+
+def git_revision() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def peak_memory_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def bench_load(input_json: Path) -> tuple[list[Page], dict]:
+    start = time.perf_counter()
+    pages = load_pages(input_json)
+    return pages, {"load": time.perf_counter() - start}
+
+
+def bench_convert(pages: list[Page], profiler) -> tuple[list[dict[str, str]], dict, list[tuple[float, str, str]]]:
+    kind_times = defaultdict(float)
+    kind_counts = defaultdict(int)
+    page_times = []
+    results = []
+
+    if profiler:
+        profiler.start() if hasattr(profiler, "start") else profiler.enable()
+    for page in pages:
+        kind = page.kind
+        start = time.perf_counter()
+        results.append(render_page_files(page))
+        elapsed = time.perf_counter() - start
+        kind_times[kind] += elapsed
+        kind_counts[kind] += 1
+        page_times.append((elapsed, page.route or "/", kind))
+    if profiler:
+        profiler.stop() if hasattr(profiler, "stop") else profiler.disable()
+
+    kinds = {
+        kind: {"pages": kind_counts[kind], "seconds": kind_times[kind]}
+        for kind in sorted(kind_times, key=lambda k: BODY_KINDS.index(k) if k in BODY_KINDS else len(BODY_KINDS))
+    }
+    return results, kinds, page_times
+
+
+def bench_write(results: list[dict[str, str]]) -> tuple[float, int]:
+    written = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        output_path = Path(tmp)
+        start = time.perf_counter()
+        for files in results:
+            for file, content in files.items():
+                file_path = output_path / file
+                file_path.parent.mkdir(parents=True, exist_ok=True)
+                written += file_path.write_text(content, encoding="utf-8")
+        return time.perf_counter() - start, written
+
+
+def make_profiler(kind: str | None):
+    if kind == "cprofile":
+        return cProfile.Profile()
+    if kind == "pyinstrument":
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            logger.error("pyinstrument is not installed")
+            exit(1)
+        return Profiler()
+    return None
+
+
+def dump_profile(profiler, kind: str, path: Path) -> None:
+    if kind == "cprofile":
+        out = path.with_suffix(".prof")
+        profiler.dump_stats(out)
+    else:
+        out = path.with_suffix(".html")
+        out.write_text(profiler.output_html(), encoding="utf-8")
+    logger.success(f"Profile written to {out}")
+
+
+def run_once(args: argparse.Namespace, profiler) -> dict:
+    if not args.warm_cache:
+        html_converter.FRAGMENT_CACHE.entries.clear()
+    html_converter.FRAGMENT_CACHE.export_delta()
+
+    pages, load_stages = bench_load(args.input)
+    start = time.perf_counter()
+    results, kinds, page_times = bench_convert(pages, profiler)
+    convert_time = time.perf_counter() - start
+    write_time, written = bench_write(results)
+    cache = html_converter.FRAGMENT_CACHE.export_delta()
+
+    return {
+        "pages": len(pages),
+        "stages": {**load_stages, "convert": convert_time, "write": write_time},
+        "kinds": kinds,
+        "slowest": [
+            {"route": route, "kind": kind, "seconds": seconds}
+            for seconds, route, kind in sorted(page_times, reverse=True)[:args.top]
+        ],
+        "bytes_written": written,
+        "fragment_cache": {"hits": cache["hits"], "misses": cache["misses"]},
+    }
+
+
+def print_report(report: dict) -> None:
+    console = Console()
+    stages = Table(title=f"Stages ({report['pages']} pages)")
+    stages.add_column("Stage")
+    stages.add_column("Seconds", justify="right")
+    stages.add_column("Pages/s", justify="right")
+    for stage, seconds in report["stages"].items():
+        stages.add_row(stage, f"{seconds:.4f}", f"{report['pages'] / seconds:.1f}" if seconds else "-")
+    console.print(stages)
+
+    kinds = Table(title="Conversion by body kind")
+    kinds.add_column("Kind")
+    kinds.add_column("Pages", justify="right")
+    kinds.add_column("Seconds", justify="right")
+    kinds.add_column("ms/page", justify="right")
+    for kind, data in report["kinds"].items():
+        kinds.add_row(kind, str(data["pages"]), f"{data['seconds']:.4f}", f"{data['seconds'] / data['pages'] * 1000:.2f}")
+    console.print(kinds)
+
+    slowest = Table(title="Slowest pages")
+    slowest.add_column("Route")
+    slowest.add_column("Kind")
+    slowest.add_column("ms", justify="right")
+    for page in report["slowest"]:
+        slowest.add_row(page["route"], page["kind"], f"{page['seconds'] * 1000:.2f}")
+    console.print(slowest)
+
+    cache = report["fragment_cache"]
+    console.print(f"Peak memory: {report['peak_memory_mb']:.1f} MB, fragment cache {cache['hits']} hits / {cache['misses']} misses")
+
+
+def print_comparison(report: dict, baseline: dict) -> None:
+    table = Table(title=f"Compared to {baseline.get('revision') or 'baseline'}")
+    if baseline.get("input_sha256") != report["input_sha256"]:
+        table.caption = "[red]The baseline was measured on a different input, stage times are not comparable[/red]"
+    table.add_column("Stage")
+    table.add_column("Baseline", justify="right")
+    table.add_column("Current", justify="right")
+    table.add_column("Change", justify="right")
+    for stage, seconds in report["stages"].items():
+        before = baseline["stages"].get(stage)
+        if not before:
+            continue
+        change = (seconds - before) / before * 100
+        color = "red" if change > 5 else "green" if change < -5 else "white"
+        table.add_row(stage, f"{before:.4f}", f"{seconds:.4f}", f"[{color}]{change:+.1f}%[/{color}]")
+    Console().print(table)
+
+
+def main():
+    args = parse_args()
+    if args.record:
+        FIXTURE_JSON.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copyfile(RECORD_SOURCE, FIXTURE_JSON)
+        logger.success(f"Recorded {RECORD_SOURCE} as {FIXTURE_JSON}")
+        return
+    if not args.input.exists():
+        logger.error(f"Fixture {args.input} does not exist, record one with --record")
+        exit(1)
+
+    logger.remove()
+    html_converter.configure({"parser": args.html_parser, "highlight": args.highlight})
+    profiler = make_profiler(args.profile)
+    runs = [run_once(args, profiler if index == 0 else None) for index in range(max(args.repeat, 1))]
+    report = min(runs, key=lambda run: sum(run["stages"].values()))
+    report.update({
+        "revision": git_revision(),
+        "input": str(args.input),
+        "input_sha256": hash_files(args.input),
+        "html_parser": args.html_parser,
+        "repeat": len(runs),
+        "peak_memory_mb": peak_memory_mb(),
+    })
+
+    print_report(report)
+    if args.baseline:
+        print_comparison(report, json.loads(args.baseline.read_text(encoding="utf-8")))
+    if profiler:
+        dump_profile(profiler, args.profile, args.profile_out)
+    if args.json:
+        args.json.write_text(json.dumps(report, indent=2) + "\n", encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
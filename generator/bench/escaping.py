@@ -0,0 +1,93 @@
+import argparse
+import json
+import time
+from pathlib import Path
+
+from loguru import logger
+from rich.console import Console
+from rich.table import Table
+
+from src import escaping
+from src.html_tree import parse_fragment
+from src.legacy_escaping import LEGACY
+
+FIXTURE_JSON = Path(__file__).parent / "fixtures" / "output.json"
+CONTEXTS = ("mdx_text", "code_span", "table_cell", "js_string", "template_literal", "jsx_attribute", "quoted_string")
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Micro-benchmark of the escapers in src.escaping against the str.replace chains they replaced")
+    parser.add_argument("--input", type=Path, default=FIXTURE_JSON, help="Recorded typst-docs JSON whose strings are escaped")
+    parser.add_argument("--repeat", type=int, default=5, help="Number of timed repetitions, the fastest one is reported")
+    return parser.parse_args()
+
+
+def collect_strings(value, strings: list[str]) -> None:
+    if isinstance(value, str):
+        # HTML is escaped one text node at a time, the way html_to_mdx sees it.
+        strings.extend(parse_fragment(value).get_text("\0").split("\0") if "<" in value else [value])
+    elif isinstance(value, list):
+        for item in value:
+            collect_strings(item, strings)
+    elif isinstance(value, dict):
+        for item in value.values():
+            collect_strings(item, strings)
+
+
+def collect_cells(value, cells: list[str]) -> None:
+    # Symbol table cells, the only strings table_cell escapes.
+    if isinstance(value, list):
+        for item in value:
+            collect_cells(item, cells)
+    elif isinstance(value, dict):
+        if "mathClass" in value:
+            cells.extend(value.get(key) or "" for key in ("value", "name", "mathClass"))
+        for item in value.values():
+            collect_cells(item, cells)
+
+
+def best_time(function, strings: list[str], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for text in strings:
+            function(text)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    args = parse_args()
+    if not args.input.exists():
+        logger.error(f"Fixture {args.input} does not exist, record one with python -m bench --record")
+        exit(1)
+    data = json.loads(args.input.read_text(encoding="utf-8"))
+    strings, cells = [], []
+    collect_strings(data, strings)
+    collect_cells(data, cells)
+    inputs = {"strings": [text for text in strings if text], "table cells": [text for text in cells if text]}
+
+    table = Table(title=f"Escaping {len(inputs['strings'])} strings and {len(inputs['table cells'])} table cells")
+    table.add_column("Context")
+    table.add_column("Input")
+    table.add_column("Legacy ms", justify="right")
+    table.add_column("Escaper ms", justify="right")
+    table.add_column("Speedup", justify="right")
+    for context in CONTEXTS:
+        escape, legacy = getattr(escaping, context), LEGACY.get(context)
+        name = "table cells" if context == "table_cell" else "strings"
+        strings = inputs[name]
+        seconds = best_time(escape, strings, args.repeat)
+        legacy_seconds = best_time(legacy, strings, args.repeat) if legacy else None
+        table.add_row(
+            context,
+            name,
+            f"{legacy_seconds * 1000:.2f}" if legacy else "-",
+            f"{seconds * 1000:.2f}",
+            f"{legacy_seconds / seconds:.2f}x" if legacy else "-",
+        )
+    Console().print(table)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1 @@
+# Lets the tests import the generator modules as `src.*`, the way main.py does.
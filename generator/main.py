@@ -1,16 +1,49 @@
+import argparse
+import multiprocessing
 import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from git import Repo, exc
 from loguru import logger
 
-from src.mdx_converter import generate_mdx_docs
+from src import assets, mdx_converter, route_filter, sync
+from src import html_to_mdx as html_converter
+from src.assets import IMAGE_FORMATS
+from src.docs_cache import DOCS_BINARY, DOCS_CACHE_SIZE, BinaryCache, DocsCache, docs_fingerprint, link_or_copy
+from src.html_to_mdx import HIGHLIGHT_MODES, PARSER_BACKENDS, configure
+from src.manifest import hash_bytes
+from src.mdx_converter import STREAMING_AVAILABLE, TYPE_TABLE_MODES, compare_parser_backends
+from src.page_split import PAGE_BUDGET
+from src.schema import SchemaError
+from src.search_index import write_versions
+from src.metrics import METRICS
 from src.utils import RichCloneProgress, run_process_with_progress
+from src.watch import converter_sources, reload_converter, watch
 
 BUILD_DIR = Path("build")
 TYPST_DIR = BUILD_DIR / "typst"
+TYPST_REMOTE = "https://github.com/typst/typst.git"
+# Workspace members cargo needs to resolve the typst-docs package.
+TYPST_SPARSE_PATHS = ("crates", "docs", "tests/src", "tests/fuzz")
 ASSETS_DIR = BUILD_DIR / "assets"
+OPTIMIZED_ASSETS_DIR = BUILD_DIR / "assets-optimized"
+ASSET_CACHE_PATH = BUILD_DIR / "asset_cache.json"
+IMAGE_METADATA_PATH = BUILD_DIR / "image_metadata.json"
+SEARCH_INDEX_PATH = BUILD_DIR / "search"
 OUTPUT_JSON = BUILD_DIR / "output.json"
+DOCS_CACHE_DIR = BUILD_DIR / "docs-cache"
+BINARY_CACHE_DIR = BUILD_DIR / "bin"
 MDX_PATH = BUILD_DIR / "docs"
+MANIFEST_PATH = BUILD_DIR / "manifest.json"
+FRAGMENT_CACHE_PATH = BUILD_DIR / "fragment_cache.json"
+METRICS_JSON = BUILD_DIR / "metrics.json"
+METRICS_OPENMETRICS = BUILD_DIR / "metrics.prom"
+VERSIONS_DIR = BUILD_DIR / "versions"
+ASSET_STORE_DIR = BUILD_DIR / "asset-store"
+CARGO_TARGET_DIR = BUILD_DIR / "cargo-target"
+WEBAPP_DIR = Path("../webapp")
 
 
 def ensure_directories():
@@ -26,51 +59,445 @@ def ensure_directories():
         logger.info(f"Directory {MDX_PATH} already exists")
 
 
-def get_typst() -> None:
-    REPO_URL = "https://github.com/typst/typst.git"
-    if os.path.exists(TYPST_DIR):
-        logger.success(f"Directory {TYPST_DIR} already exists, skipping")
+def open_typst_repo(typst_dir: Path, remote: str, sparse: bool) -> Repo:
+    if (typst_dir / ".git").exists():
+        repo = Repo(typst_dir)
+        if repo.remotes.origin.url != remote:
+            repo.remotes.origin.set_url(remote)
+        return repo
+    logger.info(f"Initializing {typst_dir}")
+    repo = Repo.init(typst_dir, mkdir=True)
+    repo.create_remote("origin", remote)
+    repo.git.config("extensions.partialClone", "origin")
+    if sparse:
+        repo.git.sparse_checkout("set", "--cone", *TYPST_SPARSE_PATHS)
+    return repo
+
+
+def get_typst(ref: str = "main", remote: str = TYPST_REMOTE, sparse: bool = True, typst_dir: Path = TYPST_DIR) -> None:
+    if typst_dir.exists() and not (typst_dir / ".git").exists():
+        logger.error(f"{typst_dir} exists but is not a git checkout")
         return
     try:
-        Repo.clone_from(REPO_URL, TYPST_DIR, progress=RichCloneProgress())
-    except Exception as e:
-        logger.error(f"Failed to clone {REPO_URL}: {e}")
+        repo = open_typst_repo(typst_dir, remote, sparse)
+        current = repo.head.commit.hexsha if repo.head.is_valid() else None
+        if current and len(ref) >= 7 and current.startswith(ref):
+            logger.success(f"{typst_dir} is already at {ref}, skipping")
+            return
+        repo.remotes.origin.fetch(ref, progress=RichCloneProgress(), depth=1, filter="blob:none")
+        target = repo.git.rev_parse("FETCH_HEAD")
+        if target == current:
+            logger.success(f"{typst_dir} is already at {ref} ({target[:12]}), skipping")
+            return
+        repo.git.checkout("--force", "--detach", target)
+    except exc.GitCommandError as e:
+        logger.error(f"Failed to fetch {ref} from {remote}: {e}")
         return
-    logger.success(f"Successfully cloned {REPO_URL} to {TYPST_DIR}")
+    logger.success(f"Checked out {ref} ({target[:12]}) from {remote} into {typst_dir}")
+
+
+def get_typst_worktree(ref: str, worktree: Path, remote: str = TYPST_REMOTE, sparse: bool = True, typst_dir: Path = TYPST_DIR) -> None:
+    # Versions are worktrees of the main checkout, they share its objects but build side by side.
+    if (worktree / ".git").is_dir():
+        logger.info(f"Replacing the standalone checkout {worktree} with a worktree of {typst_dir}")
+        shutil.rmtree(worktree)
+    try:
+        repo = open_typst_repo(typst_dir, remote, sparse)
+        repo.git.worktree("prune")
+        repo.remotes.origin.fetch(ref, progress=RichCloneProgress(), depth=1, filter="blob:none")
+        target = repo.git.rev_parse("FETCH_HEAD")
+        if not (worktree / ".git").exists():
+            repo.git.worktree("add", "--no-checkout", "--detach", str(worktree.resolve()), target)
+            if sparse:
+                Repo(worktree).git.sparse_checkout("set", "--cone", *TYPST_SPARSE_PATHS)
+        checkout = Repo(worktree)
+        if checkout.head.is_valid() and checkout.head.commit.hexsha == target and (worktree / "Cargo.toml").exists():
+            logger.success(f"{worktree} is already at {ref} ({target[:12]}), skipping")
+            return
+        checkout.git.checkout("--force", "--detach", target)
+    except exc.GitCommandError as e:
+        logger.error(f"Failed to check out {ref} from {remote} into {worktree}: {e}")
+        return
+    logger.success(f"Checked out {ref} ({target[:12]}) into worktree {worktree}")
+
+
+def get_docs_binary(typst_dir: Path, fingerprint: str | None, target_dir: Path | None = None, cargo_jobs: int | None = None, cache_size: int = DOCS_CACHE_SIZE) -> Path:
+    cache = BinaryCache(BINARY_CACHE_DIR, cache_size)
+    if fingerprint:
+        cached = cache.get(fingerprint)
+        if cached:
+            logger.success(f"Using cached typst-docs binary {fingerprint[:12]}")
+            return cached
+
+    cmd = ["cargo", "build", "--release", "--package", "typst-docs", "--color", "always"]
+    if cargo_jobs:
+        cmd += ["--jobs", str(cargo_jobs)]
+    logger.info(f"Running cargo command: {' '.join(cmd)}")
+    env = {**os.environ, "CARGO_TARGET_DIR": str(target_dir.resolve())} if target_dir else None
+    with METRICS.stage("compile_typst_docs"):
+        return_code = run_process_with_progress(cmd, "Compiling typst-docs", typst_dir, env)
+    if return_code != 0:
+        logger.error(f"Cargo command failed with return code {return_code}")
+        exit(1)
+    binary = (target_dir or typst_dir / "target") / "release" / DOCS_BINARY
+    return cache.store(fingerprint, binary) if fingerprint else binary
 
 
-def get_docs_json(force: bool = False) -> Path | None:
-    if not force and OUTPUT_JSON.exists():
-        logger.success(f"File {OUTPUT_JSON} already exists, skipping")
-        return OUTPUT_JSON
+def get_docs_json(
+    force: bool = False,
+    use_cache: bool = True,
+    typst_dir: Path = TYPST_DIR,
+    assets_dir: Path = ASSETS_DIR,
+    output_json: Path = OUTPUT_JSON,
+    target_dir: Path | None = None,
+    cargo_jobs: int | None = None,
+    cache_size: int = DOCS_CACHE_SIZE,
+) -> Path | None:
+    output_fingerprint = output_json.with_suffix(".fingerprint")
+    fingerprint = docs_fingerprint(typst_dir) if use_cache else None
+    cache = DocsCache(DOCS_CACHE_DIR, cache_size)
+    if fingerprint and not force:
+        stamp = output_fingerprint.read_text().strip() if output_fingerprint.exists() else None
+        if stamp == fingerprint and output_json.exists():
+            logger.success(f"File {output_json} is up to date with {typst_dir}, skipping")
+            return output_json
+        if cache.restore(fingerprint, output_json, assets_dir):
+            output_fingerprint.write_text(fingerprint)
+            return output_json
+    elif not force and output_json.exists():
+        logger.success(f"File {output_json} already exists, skipping")
+        return output_json
+
+    # Outputs may be hard links into the cache, never let cargo write through them.
+    output_fingerprint.unlink(missing_ok=True)
+    output_json.unlink(missing_ok=True)
+    shutil.rmtree(assets_dir, ignore_errors=True)
+    assets_dir.mkdir(parents=True)
+    # The binary only depends on the same inputs as its output, so it is cached under the same fingerprint.
+    binary = get_docs_binary(typst_dir, fingerprint or docs_fingerprint(typst_dir), target_dir, cargo_jobs, cache_size)
     cmd = [
-        "cargo", "run", 
-        "--package", "typst-docs", 
-        "--color", "always", 
-        "--", 
-        "--assets-dir", ASSETS_DIR, 
-        "--out-file", OUTPUT_JSON
+        binary.resolve(),
+        "--assets-dir", assets_dir.resolve(),
+        "--out-file", output_json.resolve()
     ]
 
-    logger.info(f"Running cargo command: {' '.join(cmd)}")
-    return_code = run_process_with_progress(cmd, "Building docs", TYPST_DIR)
+    logger.info(f"Running typst-docs: {' '.join(map(str, cmd))}")
+    with METRICS.stage("render_typst_docs"):
+        return_code = run_process_with_progress(cmd, "Rendering docs", typst_dir)
 
     if return_code != 0:
-        logger.error(f"Cargo command failed with return code {return_code}")
+        logger.error(f"typst-docs failed with return code {return_code}")
         exit(1)
-    logger.success("Cargo command completed successfully")
+    logger.success("typst-docs completed successfully")
+    METRICS.add_bytes(written=output_json.stat().st_size)
+
+    if fingerprint:
+        cache.store(fingerprint, output_json, assets_dir)
+        output_fingerprint.write_text(fingerprint)
+    return output_json
+
+
+def dedupe_assets(assets_dir: Path, store: Path = ASSET_STORE_DIR) -> int:
+    store.mkdir(parents=True, exist_ok=True)
+    linked = 0
+    for file in sorted(assets_dir.rglob("*")):
+        if not file.is_file():
+            continue
+        stored = store / f"{hash_bytes(file.read_bytes())}{file.suffix}"
+        if not stored.exists():
+            # Versions dedupe into the same store in parallel, a file only appears there once it is complete.
+            staged = store / f".{stored.name}.{os.getpid()}.tmp"
+            staged.unlink(missing_ok=True)
+            link_or_copy(file, staged)
+            os.replace(staged, stored)
+            continue
+        if os.path.samefile(file, stored):
+            continue
+        temporary = file.with_name(f".{file.name}.tmp")
+        temporary.unlink(missing_ok=True)
+        link_or_copy(stored, temporary)
+        os.replace(temporary, file)
+        linked += 1
+    return linked
+
+
+def prepare_version(version: str, args: argparse.Namespace, checkout_lock) -> tuple[dict, dict]:
+    # Runs in a worker process, which may have built another version before.
+    METRICS.reset()
+    version_dir = VERSIONS_DIR / version
+    typst_dir = version_dir / "typst"
+    assets_dir = version_dir / "assets"
+    output_json = version_dir / "output.json"
+
+    # Only git operations on the shared repository are serialized, cargo builds in its own target dir per version.
+    with checkout_lock:
+        with METRICS.stage(f"get_typst[{version}]"):
+            get_typst_worktree(version, typst_dir, args.typst_remote, args.typst_sparse)
+    with METRICS.stage(f"get_docs_json[{version}]"):
+        # Every version stores its output and binary at once, none may evict another one of the same run.
+        cache_size = max(DOCS_CACHE_SIZE, len(args.versions))
+        json = get_docs_json(args.force_docs, args.docs_cache, typst_dir, assets_dir, output_json, (args.cargo_target_dir or CARGO_TARGET_DIR) / version, args.cargo_jobs, cache_size)
+    if not json:
+        raise RuntimeError(f"Failed to get Typst docs json for {version}")
+    asset_names = None
+    if args.optimize_assets:
+        with METRICS.stage(f"optimize_assets[{version}]"):
+            optimized_dir = version_dir / "assets-optimized"
+            asset_names = assets.optimize_assets(assets_dir, optimized_dir, version_dir / "asset_cache.json", tuple(args.asset_formats), args.jobs)
+            assets_dir = optimized_dir
+    images = None
+    if args.image_metadata:
+        with METRICS.stage(f"collect_image_metadata[{version}]"):
+            images = assets.collect_image_metadata(assets_dir, version_dir / "image_metadata.json", args.jobs)
+    with METRICS.stage(f"dedupe_assets[{version}]"):
+        linked = dedupe_assets(assets_dir)
+    METRICS.count("assets_deduplicated", linked)
+    build = {
+        "version": version,
+        "input_json": json,
+        "output_path": MDX_PATH / version,
+        "manifest_path": version_dir / "manifest.json",
+        "assets": asset_names,
+        "images": images,
+    }
+    return build, METRICS.to_dict()
+
+
+def build_version(build: dict, args: argparse.Namespace) -> tuple[dict, dict]:
+    METRICS.reset()
+    # Forked workers start out with the counters and new entries of the shared fragment pass, only report their own.
+    html_converter.FRAGMENT_CACHE.export_delta()
+    version = build["version"]
+    with METRICS.stage(f"generate_mdx_docs[{version}]"):
+        mdx_converter.generate_mdx_docs(
+            build["input_json"],
+            build["output_path"],
+            build["manifest_path"],
+            jobs=args.jobs,
+            page_budget=args.page_budget,
+            type_tables=args.type_tables,
+            shared_partials=args.shared_partials,
+            routes=route_filter.RouteFilter(args.only, args.exclude),
+            streaming=args.stream,
+            version=version,
+            assets=build["assets"],
+            images=build["images"],
+            search_path=SEARCH_INDEX_PATH / version if args.search_index else None,
+        )
+    return html_converter.FRAGMENT_CACHE.export_delta(), METRICS.to_dict()
+
+
+def run_versions(args: argparse.Namespace) -> None:
+    fragment_cache = html_converter.FRAGMENT_CACHE
+    cache_path = FRAGMENT_CACHE_PATH if args.fragment_cache else None
+    if cache_path:
+        fragment_cache.load(cache_path)
+    builds, failed = [], []
+    with multiprocessing.Manager() as manager:
+        checkout_lock = manager.Lock()
+        with ProcessPoolExecutor(max_workers=len(args.versions)) as executor:
+            futures = {version: executor.submit(prepare_version, version, args, checkout_lock) for version in args.versions}
+            for version, future in futures.items():
+                try:
+                    build, metrics = future.result()
+                except (Exception, SystemExit) as e:
+                    logger.error(f"Failed to build {version}: {e}")
+                    failed.append(version)
+                    continue
+                builds.append(build)
+                METRICS.merge(metrics)
+
+    # Fragments the versions have in common are converted once here, each version converts the rest in its own process
+    # and they are merged into the shared cache afterwards.
+    shared = {}
+    if len(builds) > 1:
+        with METRICS.stage("convert_shared_fragments"):
+            shared = mdx_converter.convert_shared_fragments(
+                builds, args.jobs, args.stream, args.page_budget, args.type_tables, route_filter.RouteFilter(args.only, args.exclude)
+            )
+        METRICS.count("shared_fragments", len(shared))
+    options = dict(html_converter.OPTIONS)
+    with ProcessPoolExecutor(max_workers=max(len(builds), 1), initializer=mdx_converter.init_worker, initargs=(options, cache_path, shared)) as executor:
+        futures = {build["version"]: executor.submit(build_version, build, args) for build in builds}
+        for version, future in futures.items():
+            try:
+                cache_delta, metrics = future.result()
+            except (Exception, SystemExit) as e:
+                logger.error(f"Failed to build {version}: {e}")
+                failed.append(version)
+                continue
+            fragment_cache.merge_delta(cache_delta)
+            METRICS.merge(metrics)
+    if cache_path:
+        fragment_cache.save(cache_path)
+    if failed:
+        exit(1)
+    logger.success(f"Generated {len(args.versions)} versions into {MDX_PATH}")
+    if args.search_index:
+        write_versions(SEARCH_INDEX_PATH)
+    asset_dir = "assets-optimized" if args.optimize_assets else "assets"
+    sync_webapp(args, {version: VERSIONS_DIR / version / asset_dir for version in args.versions})
+
+
+def sync_webapp(args: argparse.Namespace, asset_sources: dict[str, Path]) -> None:
+    if not args.sync:
+        return
+    if not args.webapp_dir.is_dir():
+        logger.warning(f"{args.webapp_dir} does not exist, skipping sync")
+        return
+    targets = [({"": MDX_PATH}, args.webapp_dir / "content" / "docs", False), (asset_sources, args.webapp_dir / "public" / "assets", True)]
+    if args.search_index:
+        targets.append(({"": SEARCH_INDEX_PATH}, args.webapp_dir / "public" / "search", False))
+    with METRICS.stage("sync_webapp"):
+        for sources, target, link in targets:
+            stats = sync.sync_tree(sources, target, link)
+            METRICS.count("sync_files_updated", stats["copied"] + stats["linked"] + stats["reflinked"])
+            METRICS.count("sync_files_removed", stats["removed"])
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Generate fumadocs MDX pages from the Typst documentation")
+    parser.add_argument("command", nargs="?", choices=("build", "watch"), default="build", help=f"Build the docs once, or keep converting {OUTPUT_JSON} into {MDX_PATH} as it and the converter sources change")
+    parser.add_argument("-j", "--jobs", type=int, default=1, help="Number of worker processes used to render pages, 0 uses every CPU")
+    parser.add_argument("--html-parser", choices=PARSER_BACKENDS, default="html.parser", help="Backend used to parse HTML fragments")
+    parser.add_argument("--highlight", choices=HIGHLIGHT_MODES, default="shiki", help="Emit plain typst code blocks for the webapp to highlight with Shiki, or keep the typst-docs highlighting as pre-tokenized TypstCode components")
+    parser.add_argument("--check-parser", action="store_true", help="Render every page with html.parser and with --html-parser, report pages whose output differs and exit")
+    parser.add_argument("--fragment-cache", action=argparse.BooleanOptionalAction, default=True, help=f"Persist converted HTML fragments in {FRAGMENT_CACHE_PATH}")
+    parser.add_argument("--stream", action="store_true", help="Parse output.json incrementally with ijson instead of loading it at once")
+    parser.add_argument("--typst-ref", default="main", help="Branch, tag or commit of typst to build the docs from")
+    parser.add_argument("--typst-remote", default=TYPST_REMOTE, help="Typst repository URL or path to a local (bare) mirror")
+    parser.add_argument("--typst-sparse", action=argparse.BooleanOptionalAction, default=True, help="Only check out the parts of the typst workspace needed by typst-docs")
+    parser.add_argument("--force-docs", action="store_true", help="Always rebuild output.json with cargo, bypassing the docs cache")
+    parser.add_argument("--docs-cache", action=argparse.BooleanOptionalAction, default=True, help=f"Reuse typst-docs outputs cached in {DOCS_CACHE_DIR} by input fingerprint")
+    parser.add_argument("--cargo-jobs", type=int, help="Number of parallel jobs cargo uses to compile typst-docs, defaults to cargo's own choice")
+    parser.add_argument("--cargo-target-dir", type=Path, help=f"Cargo target directory to compile typst-docs in and keep incremental artifacts across checkouts, defaults to the checkout's own target/ ({CARGO_TARGET_DIR}/<ref> with --versions)")
+    parser.add_argument("--optimize-assets", action=argparse.BooleanOptionalAction, default=False, help=f"Recompress and transcode images into content-hashed files in {OPTIMIZED_ASSETS_DIR} and reference those")
+    parser.add_argument("--asset-formats", nargs="+", choices=IMAGE_FORMATS, default=["webp"], help="Formats PNG images are transcoded to, the smallest one is referenced and a PNG is always kept as fallback. WebP is lossless, AVIF is lossy (quality 90) and only used when listed here")
+    parser.add_argument("--image-metadata", action=argparse.BooleanOptionalAction, default=True, help="Emit intrinsic sizes, a content hash and a blurred placeholder for every referenced image")
+    parser.add_argument("--search-index", action=argparse.BooleanOptionalAction, default=True, help=f"Write a prebuilt search index sharded by section to {SEARCH_INDEX_PATH}")
+    parser.add_argument("--page-budget", type=int, default=PAGE_BUDGET, help="Split type and symbol pages whose body in output.json is larger than this many bytes into an index and sub-pages, 0 disables splitting")
+    parser.add_argument("--type-tables", choices=TYPE_TABLE_MODES, default="inline", help="Write parameter tables inline as JS object literals, or into one JSON module per page that the MDX imports")
+    parser.add_argument("--shared-partials", action=argparse.BooleanOptionalAction, default=False, help="Write blocks repeated across pages, such as shared descriptions and examples, once as MDX partials that the pages import")
+    parser.add_argument("--only", nargs="+", metavar="ROUTE", help="Only render pages under these route prefixes, e.g. reference/visualize, everything else is left as it is")
+    parser.add_argument("--exclude", nargs="+", metavar="ROUTE", help="Skip pages under these route prefixes, their existing output is kept")
+    parser.add_argument("--sync", action=argparse.BooleanOptionalAction, default=True, help=f"Mirror {MDX_PATH}, the assets and the search index into the webapp, only touching changed files")
+    parser.add_argument("--webapp-dir", type=Path, default=WEBAPP_DIR, help="Webapp whose content/docs, public/assets and public/search are synced")
+    parser.add_argument("--versions", nargs="+", metavar="REF", help=f"Generate the docs of several typst refs concurrently into {MDX_PATH}/<ref>")
+    return parser.parse_args()
 
-    return OUTPUT_JSON
-    
 
 def main():
-    ensure_directories()
-    get_typst()
-    json = get_docs_json(force=False)
+    args = parse_args()
+    if args.command == "watch":
+        run_watch(args)
+        return
+    try:
+        run_pipeline(args)
+    finally:
+        METRICS.write_report(METRICS_JSON, METRICS_OPENMETRICS)
+
+
+def run_pipeline(args: argparse.Namespace) -> None:
+    with METRICS.stage("ensure_directories"):
+        ensure_directories()
+    if args.stream and not STREAMING_AVAILABLE:
+        logger.error("Streaming mode requires the ijson package")
+        exit(1)
+    if args.versions:
+        configure({"parser": args.html_parser, "highlight": args.highlight})
+        run_versions(args)
+        return
+    with METRICS.stage("get_typst"):
+        get_typst(args.typst_ref, args.typst_remote, args.typst_sparse)
+    with METRICS.stage("get_docs_json"):
+        json = get_docs_json(force=args.force_docs, use_cache=args.docs_cache, target_dir=args.cargo_target_dir, cargo_jobs=args.cargo_jobs)
     if not json:
         logger.error("Failed to get Typst docs json")
         exit(1)
-    generate_mdx_docs(json, MDX_PATH)
+    if args.check_parser:
+        mismatches = compare_parser_backends(json, args.html_parser)
+        exit(1 if mismatches else 0)
+    configure({"parser": args.html_parser, "highlight": args.highlight})
+    asset_context = prepare_assets(args)
+    with METRICS.stage("generate_mdx_docs"):
+        try:
+            mdx_converter.generate_mdx_docs(
+                json,
+                MDX_PATH,
+                MANIFEST_PATH,
+                jobs=args.jobs,
+                page_budget=args.page_budget,
+                type_tables=args.type_tables,
+                shared_partials=args.shared_partials,
+                routes=route_filter.RouteFilter(args.only, args.exclude),
+                cache_path=FRAGMENT_CACHE_PATH if args.fragment_cache else None,
+                streaming=args.stream,
+                search_path=SEARCH_INDEX_PATH if args.search_index else None,
+                **asset_context,
+            )
+        except SchemaError as e:
+            logger.error(f"Unexpected typst-docs output in {json}: {e}")
+            exit(1)
+    sync_webapp(args, {"": OPTIMIZED_ASSETS_DIR if args.optimize_assets else ASSETS_DIR})
+
+
+def prepare_assets(args: argparse.Namespace) -> dict:
+    asset_names = None
+    if args.optimize_assets:
+        with METRICS.stage("optimize_assets"):
+            asset_names = assets.optimize_assets(ASSETS_DIR, OPTIMIZED_ASSETS_DIR, ASSET_CACHE_PATH, tuple(args.asset_formats), args.jobs)
+    images = None
+    if args.image_metadata:
+        with METRICS.stage("collect_image_metadata"):
+            images = assets.collect_image_metadata(OPTIMIZED_ASSETS_DIR if args.optimize_assets else ASSETS_DIR, IMAGE_METADATA_PATH, args.jobs)
+    return {"assets": asset_names, "images": images}
+
+
+def run_watch(args: argparse.Namespace) -> None:
+    if not OUTPUT_JSON.exists():
+        logger.error(f"{OUTPUT_JSON} does not exist, run a build first")
+        exit(1)
+    ensure_directories()
+    configure({"parser": args.html_parser, "highlight": args.highlight})
+    if args.fragment_cache:
+        html_converter.FRAGMENT_CACHE.load(FRAGMENT_CACHE_PATH)
+    state = {"pages": mdx_converter.load_pages(OUTPUT_JSON, route_filter.RouteFilter(args.only, args.exclude)), "assets": prepare_assets(args)}
+
+    def generate() -> None:
+        mdx_converter.generate_mdx_docs(
+            OUTPUT_JSON,
+            MDX_PATH,
+            MANIFEST_PATH,
+            jobs=args.jobs,
+            page_budget=args.page_budget,
+            type_tables=args.type_tables,
+            shared_partials=args.shared_partials,
+            routes=route_filter.RouteFilter(args.only, args.exclude),
+            search_path=SEARCH_INDEX_PATH if args.search_index else None,
+            pages=state["pages"],
+            **state["assets"],
+        )
+
+    def on_change(changed: set[str]) -> None:
+        start = time.perf_counter()
+        if "source" in changed:
+            logger.info("Converter sources changed, reloading")
+            reload_converter()
+            html_converter.configure({"parser": args.html_parser, "highlight": args.highlight})
+        # Pages are decoded into the classes of src.schema, a reload replaces them.
+        if "input" in changed or "source" in changed:
+            state["pages"] = mdx_converter.load_pages(OUTPUT_JSON, route_filter.RouteFilter(args.only, args.exclude))
+        if "assets" in changed or "source" in changed:
+            state["assets"] = prepare_assets(args)
+        generate()
+        sync_webapp(args, {"": OPTIMIZED_ASSETS_DIR if args.optimize_assets else ASSETS_DIR})
+        logger.success(f"Updated {MDX_PATH} in {time.perf_counter() - start:.3f}s")
+
+    generate()
+    sync_webapp(args, {"": OPTIMIZED_ASSETS_DIR if args.optimize_assets else ASSETS_DIR})
+    watch({"input": [OUTPUT_JSON], "assets": [ASSETS_DIR], "source": converter_sources(Path(__file__).parent / "src")}, on_change)
+    if args.fragment_cache:
+        html_converter.FRAGMENT_CACHE.save(FRAGMENT_CACHE_PATH)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,194 @@
+import base64
+import io
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from loguru import logger
+from src.manifest import hash_bytes, hash_files, hash_json, write_if_changed
+
+try:
+    import PIL
+    from PIL import Image, features
+except ImportError:
+    Image = None
+
+IMAGE_FORMATS = ("png", "webp", "avif")
+IMAGE_SUFFIXES = (".png",)
+METADATA_SUFFIXES = (".png", ".webp", ".avif", ".jpg", ".jpeg", ".gif")
+DIGEST_LENGTH = 20
+PLACEHOLDER_SIZE = 16
+# Pillow cannot write lossless AVIF (it needs identity matrix coefficients), so AVIF is lossy and only produced when
+# requested. At quality 100 it is still lossy and larger than lossless WebP; full chroma keeps rendered text sharp.
+AVIF_OPTIONS = {"quality": 90, "subsampling": "4:4:4"}
+
+OPTIMIZER_FINGERPRINT = hash_files(Path(__file__))
+
+
+def available_formats(formats: tuple[str, ...]) -> tuple[str, ...]:
+    if Image is None:
+        return ()
+    return tuple(fmt for fmt in formats if fmt == "png" or features.check(fmt))
+
+
+def optimizer_version(formats: tuple[str, ...]) -> str:
+    return hash_json([OPTIMIZER_FINGERPRINT, PIL.__version__ if Image else None, formats])
+
+
+def encode_image(data: bytes, fmt: str) -> bytes:
+    with Image.open(io.BytesIO(data)) as image:
+        buffer = io.BytesIO()
+        if fmt == "png":
+            image.save(buffer, format="PNG", optimize=True)
+        elif fmt == "webp":
+            image.save(buffer, format="WEBP", lossless=True)
+        else:
+            image.save(buffer, format="AVIF", **AVIF_OPTIONS)
+        return buffer.getvalue()
+
+
+def optimize_image(source: Path, digest: str, output_dir: Path, formats: tuple[str, ...]) -> dict:
+    data = source.read_bytes()
+    if source.suffix.lower() not in IMAGE_SUFFIXES:
+        name = f"{digest}{source.suffix.lower()}"
+        write_bytes_if_changed(output_dir / name, data)
+        return {"name": name, "fallback": name, "variants": {"source": {"name": name, "bytes": len(data)}}, "source_bytes": len(data)}
+    variants = {}
+    for fmt in ("png", *formats):
+        if fmt in variants:
+            continue
+        encoded = encode_image(data, fmt)
+        if fmt == "png" and len(encoded) >= len(data):
+            encoded = data
+        name = f"{digest}.{fmt}"
+        write_bytes_if_changed(output_dir / name, encoded)
+        variants[fmt] = {"name": name, "bytes": len(encoded)}
+    preferred = min(variants.values(), key=lambda variant: variant["bytes"])
+    return {"name": preferred["name"], "fallback": variants["png"]["name"], "variants": variants, "source_bytes": len(data)}
+
+
+def read_image_metadata(source: Path) -> dict:
+    with Image.open(source) as image:
+        width, height = image.size
+        image.thumbnail((PLACEHOLDER_SIZE, PLACEHOLDER_SIZE))
+        thumbnail = image.convert("RGBA" if "A" in image.getbands() or "transparency" in image.info else "RGB")
+    buffer = io.BytesIO()
+    fmt = "webp" if features.check("webp") else "png"
+    thumbnail.save(buffer, format=fmt.upper(), quality=40)
+    placeholder = f"data:image/{fmt};base64,{base64.b64encode(buffer.getvalue()).decode('ascii')}"
+    return {"width": width, "height": height, "placeholder": placeholder}
+
+
+def map_jobs(function, arguments: tuple[list, ...], jobs: int) -> list:
+    if jobs <= 1 or len(arguments[0]) <= 1:
+        return list(map(function, *arguments))
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        return list(executor.map(function, *arguments, chunksize=8))
+
+
+def write_bytes_if_changed(path: Path, data: bytes) -> None:
+    if path.is_file() and path.read_bytes() == data:
+        return
+    temporary = path.with_name(f".{path.name}.tmp")
+    temporary.write_bytes(data)
+    os.replace(temporary, path)
+
+
+class AssetCache:
+    def __init__(self, path: Path | None, version: str):
+        self.path = path
+        self.version = version
+        self.entries: dict[str, dict] = {}
+        if path and path.is_file():
+            try:
+                data = json.loads(path.read_text(encoding="utf-8"))
+            except json.JSONDecodeError:
+                logger.warning(f"Ignoring corrupted asset cache {path}")
+                return
+            if data.get("version") == version:
+                self.entries = data["entries"]
+
+    def get(self, digest: str) -> dict | None:
+        return self.entries.get(digest)
+
+    def save(self, used: set[str]) -> None:
+        if not self.path:
+            return
+        entries = {digest: entry for digest, entry in self.entries.items() if digest in used}
+        write_if_changed(self.path, json.dumps({"version": self.version, "entries": entries}, indent=1, sort_keys=True) + "\n")
+
+
+def optimize_assets(
+    assets_dir: Path,
+    output_dir: Path,
+    cache_path: Path | None = None,
+    formats: tuple[str, ...] = ("webp",),
+    jobs: int = 1,
+) -> dict[str, str]:
+    formats = available_formats(formats)
+    if Image is None:
+        logger.warning("Pillow is not installed, assets are referenced unoptimized")
+        return {}
+    output_dir.mkdir(parents=True, exist_ok=True)
+    cache = AssetCache(cache_path, optimizer_version(formats))
+
+    sources: dict[str, Path] = {}
+    digests: dict[str, str] = {}
+    for file in sorted(assets_dir.rglob("*")):
+        if not file.is_file():
+            continue
+        digest = hash_bytes(file.read_bytes())[:DIGEST_LENGTH]
+        digests[file.relative_to(assets_dir).as_posix()] = digest
+        sources.setdefault(digest, file)
+
+    results = {}
+    pending = []
+    for digest, source in sources.items():
+        entry = cache.get(digest)
+        if entry and all((output_dir / variant["name"]).is_file() for variant in entry["variants"].values()):
+            results[digest] = entry
+        else:
+            pending.append(digest)
+
+    jobs = jobs or os.cpu_count() or 1
+    if pending:
+        logger.info(f"Optimizing {len(pending)} assets to {', '.join(('png', *formats))} with {jobs} workers")
+        arguments = ([sources[d] for d in pending], pending, [output_dir] * len(pending), [formats] * len(pending))
+        results.update(zip(pending, map_jobs(optimize_image, arguments, jobs)))
+        cache.entries.update((digest, results[digest]) for digest in pending)
+
+    keep = {variant["name"] for entry in results.values() for variant in entry["variants"].values()}
+    for stale in output_dir.iterdir():
+        if stale.is_file() and stale.name not in keep:
+            stale.unlink()
+    cache.save(set(results))
+
+    source_bytes = sum(entry["source_bytes"] for entry in results.values())
+    optimized_bytes = sum(variant["bytes"] for entry in results.values() for variant in entry["variants"].values() if variant["name"] == entry["name"])
+    logger.success(f"Optimized {len(digests)} assets into {len(results)} unique files, "
+                   f"{len(results) - len(pending)} cached, {source_bytes} -> {optimized_bytes} bytes")
+    return {name: results[digest]["name"] for name, digest in digests.items()}
+
+
+def collect_image_metadata(assets_dir: Path, cache_path: Path | None = None, jobs: int = 1) -> dict[str, dict]:
+    if Image is None:
+        logger.warning("Pillow is not installed, images are emitted without dimensions and placeholders")
+        return {}
+    cache = AssetCache(cache_path, hash_json([OPTIMIZER_FINGERPRINT, PIL.__version__, "metadata"]))
+
+    digests: dict[str, str] = {}
+    sources: dict[str, Path] = {}
+    for file in sorted(assets_dir.rglob("*")):
+        if file.is_file() and file.suffix.lower() in METADATA_SUFFIXES:
+            digest = hash_bytes(file.read_bytes())[:DIGEST_LENGTH]
+            digests[file.relative_to(assets_dir).as_posix()] = digest
+            sources.setdefault(digest, file)
+
+    pending = [digest for digest in sources if cache.get(digest) is None]
+    if pending:
+        jobs = jobs or os.cpu_count() or 1
+        logger.info(f"Reading metadata of {len(pending)} images with {jobs} workers")
+        cache.entries.update(zip(pending, map_jobs(read_image_metadata, ([sources[d] for d in pending],), jobs)))
+    cache.save(set(sources))
+    logger.success(f"Collected metadata of {len(digests)} images, {len(sources) - len(pending)} cached")
+    return {name: {**cache.get(digest), "hash": digest} for name, digest in digests.items()}
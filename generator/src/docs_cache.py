@@ -0,0 +1,119 @@
+import os
+import shutil
+import subprocess
+from pathlib import Path
+from git import InvalidGitRepositoryError, NoSuchPathError, Repo
+from loguru import logger
+from src.manifest import hash_bytes, hash_json
+
+DOCS_INPUT_PATHS = ("Cargo.toml", "Cargo.lock", "rust-toolchain.toml", "docs", "crates")
+DOCS_CACHE_SIZE = 4
+DOCS_BINARY = "typst-docs.exe" if os.name == "nt" else "typst-docs"
+
+
+def toolchain_version(cwd: Path) -> list[str] | None:
+    versions = []
+    for tool in ("rustc", "cargo"):
+        try:
+            result = subprocess.run([tool, "--version"], capture_output=True, text=True, check=True, cwd=cwd)
+        except (OSError, subprocess.CalledProcessError):
+            return None
+        versions.append(result.stdout.strip())
+    return versions
+
+
+def docs_fingerprint(typst_dir: Path) -> str | None:
+    try:
+        repo = Repo(typst_dir)
+        tree = repo.head.commit.tree
+    except (InvalidGitRepositoryError, NoSuchPathError, ValueError) as e:
+        logger.warning(f"Cannot fingerprint {typst_dir}: {e}")
+        return None
+    toolchain = toolchain_version(typst_dir)
+    if toolchain is None:
+        logger.warning("Cannot determine the Rust toolchain version")
+        return None
+
+    paths = [path for path in DOCS_INPUT_PATHS if (typst_dir / path).exists()]
+    inputs = {path: tree[path].hexsha for path in paths if path in tree}
+    changes = repo.git.diff("HEAD", "--binary", "--", *paths)
+    untracked = {
+        file: hash_bytes((typst_dir / file).read_bytes())
+        for file in repo.untracked_files
+        if file.split("/")[0] in paths
+    }
+    return hash_json({"inputs": inputs, "changes": hash_bytes(changes.encode()), "untracked": untracked, "toolchain": toolchain})
+
+
+def link_or_copy(source: Path | str, target: Path | str) -> None:
+    Path(target).parent.mkdir(parents=True, exist_ok=True)
+    try:
+        os.link(source, target)
+    except OSError:
+        shutil.copy2(source, target)
+
+
+def link_tree(source: Path, target: Path) -> None:
+    shutil.copytree(source, target, copy_function=link_or_copy)
+
+
+class DocsCache:
+    def __init__(self, root: Path, max_entries: int = DOCS_CACHE_SIZE):
+        self.root = root
+        self.max_entries = max_entries
+
+    def entry(self, fingerprint: str) -> Path:
+        return self.root / fingerprint
+
+    def restore(self, fingerprint: str, output_json: Path, assets_dir: Path) -> bool:
+        entry = self.entry(fingerprint)
+        if not (entry / "output.json").is_file() or not (entry / "assets").is_dir():
+            return False
+        output_json.unlink(missing_ok=True)
+        link_or_copy(entry / "output.json", output_json)
+        shutil.rmtree(assets_dir, ignore_errors=True)
+        link_tree(entry / "assets", assets_dir)
+        os.utime(entry)
+        logger.success(f"Restored typst-docs output {fingerprint[:12]} from {self.root}")
+        return True
+
+    def store(self, fingerprint: str, output_json: Path, assets_dir: Path) -> None:
+        entry = self.entry(fingerprint)
+        staging = entry.with_name(f"{entry.name}.tmp")
+        shutil.rmtree(staging, ignore_errors=True)
+        staging.mkdir(parents=True)
+        link_or_copy(output_json, staging / "output.json")
+        link_tree(assets_dir, staging / "assets")
+        shutil.rmtree(entry, ignore_errors=True)
+        staging.rename(entry)
+        logger.info(f"Cached typst-docs output {fingerprint[:12]} in {self.root}")
+        self.evict()
+
+    def evict(self) -> None:
+        entries = sorted(
+            (path for path in self.root.iterdir() if path.is_dir() and not path.name.endswith(".tmp")),
+            key=lambda path: path.stat().st_mtime,
+            reverse=True,
+        )
+        for stale in entries[self.max_entries:]:
+            logger.info(f"Evicting cached typst-docs output {stale.name[:12]}")
+            shutil.rmtree(stale)
+
+
+class BinaryCache(DocsCache):
+    def get(self, fingerprint: str) -> Path | None:
+        binary = self.entry(fingerprint) / DOCS_BINARY
+        if not binary.is_file():
+            return None
+        os.utime(binary.parent)
+        return binary
+
+    def store(self, fingerprint: str, binary: Path) -> Path:
+        entry = self.entry(fingerprint)
+        entry.mkdir(parents=True, exist_ok=True)
+        temporary = entry / f".{DOCS_BINARY}.tmp"
+        shutil.copy2(binary, temporary)
+        os.replace(temporary, entry / DOCS_BINARY)
+        logger.info(f"Cached typst-docs binary {fingerprint[:12]} in {self.root}")
+        self.evict()
+        return entry / DOCS_BINARY
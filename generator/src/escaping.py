@@ -0,0 +1,55 @@
+import re
+from typing import Callable
+
+# One escaper per output context. Most strings contain none of the special characters and come back after a
+# single scan; otherwise the replacements run as one chained expression.
+
+FAST_PATH_MIN_CHARS = 4
+
+
+def chained_replace(pairs: tuple[tuple[str, str], ...]) -> Callable[[str], str]:
+    # Generated once, like dataclasses generate __init__, so a call is a chain of str.replace without a Python loop.
+    source = "lambda text: text" + "".join(f".replace({char!r}, {replacement!r})" for char, replacement in pairs)
+    return eval(source, {})
+
+
+def escaper(replacements: dict[str, str]) -> Callable[[str], str]:
+    # Characters that appear in other replacements go first, so the escapes they introduce are not escaped again.
+    introduced = {added for char, replacement in replacements.items() for added in replacement if added != char}
+    pairs = tuple(sorted(replacements.items(), key=lambda pair: pair[0] not in introduced))
+    replace = chained_replace(pairs)
+    # For a few characters the chain is as cheap as a scan, larger sets only pay off with one.
+    if len(pairs) < FAST_PATH_MIN_CHARS:
+        return replace
+    special = re.compile("[" + re.escape("".join(replacements)) + "]").search
+    single = dict(pairs)
+
+    def escape(text: str) -> str:
+        # Symbol table cells are mostly one character long.
+        if len(text) == 1:
+            return single.get(text, text)
+        return text if special(text) is None else replace(text)
+    return escape
+
+
+def backslashed(chars: str) -> dict[str, str]:
+    return {char: f"\\{char}" for char in chars}
+
+
+MDX_TEXT = backslashed("\\&<>{}*_`")
+# Code spans are literal in MDX, braces are escaped only because the {:lang} suffix is parsed from them.
+CODE_SPAN = backslashed("{}")
+TABLE_CELL = backslashed("|`'\"\\{}<>")
+JS_STRING = {**backslashed("\\'"), "\n": " "}
+TEMPLATE_LITERAL = backslashed("\\`$")
+JSX_ATTRIBUTE = {"&": "&amp;", '"': "&quot;", "'": "&#39;"}
+# Double quoted strings in the frontmatter and meta.json, where YAML and JSON escapes agree.
+QUOTED_STRING = {**backslashed('\\"'), "\n": " "}
+
+mdx_text = escaper(MDX_TEXT)
+code_span = escaper(CODE_SPAN)
+table_cell = escaper(TABLE_CELL)
+js_string = escaper(JS_STRING)
+template_literal = escaper(TEMPLATE_LITERAL)
+jsx_attribute = escaper(JSX_ATTRIBUTE)
+quoted_string = escaper(QUOTED_STRING)
@@ -0,0 +1,83 @@
+import json
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from loguru import logger
+from src.manifest import write_if_changed
+
+CACHE_SIZE = 16384
+
+
+class FragmentCache:
+    def __init__(self, max_size: int = CACHE_SIZE):
+        self.max_size = max_size
+        self.version = ""
+        # Values are the converted text and the components it uses, as lists so they round-trip through JSON.
+        self.entries: OrderedDict[str, list] = OrderedDict()
+        self.new_entries: dict[str, list] = {}
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def set_version(self, version: str) -> None:
+        if version != self.version:
+            self.version = version
+            self.entries.clear()
+            self.new_entries.clear()
+
+    def get(self, key: str) -> list | None:
+        with self.lock:
+            value = self.entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: str, value: list) -> None:
+        with self.lock:
+            self.entries[key] = value
+            self.new_entries[key] = value
+            if len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def export_delta(self) -> dict:
+        with self.lock:
+            delta = {"entries": self.new_entries, "hits": self.hits, "misses": self.misses}
+            self.new_entries = {}
+            self.hits = self.misses = 0
+            return delta
+
+    def merge_delta(self, delta: dict) -> None:
+        for key, value in delta["entries"].items():
+            self.put(key, value)
+        with self.lock:
+            self.hits += delta["hits"]
+            self.misses += delta["misses"]
+
+    def load(self, path: Path) -> None:
+        if not path.is_file():
+            return
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+        except json.JSONDecodeError:
+            logger.warning(f"Ignoring corrupted fragment cache {path}")
+            return
+        if data.get("version") != self.version:
+            logger.info("Converter version changed, discarding fragment cache")
+            return
+        self.update(data["entries"])
+
+    def update(self, entries: dict[str, list]) -> None:
+        # Entries converted elsewhere, unlike put they are not part of the next delta.
+        with self.lock:
+            for key, value in entries.items():
+                self.entries[key] = value
+                if len(self.entries) > self.max_size:
+                    self.entries.popitem(last=False)
+
+    def save(self, path: Path) -> None:
+        with self.lock:
+            data = {"version": self.version, "entries": dict(self.entries)}
+        write_if_changed(path, json.dumps(data, ensure_ascii=False) + "\n")
@@ -1,28 +1,72 @@
+import json
+import re
 import textwrap
+import threading
+from pathlib import Path
 
 from bs4 import BeautifulSoup, Tag, NavigableString
 from loguru import logger
-
-def escape_mdx_text(text: str) -> str:
-    text = text.replace("\\", "\\\\")
-
-    text = text.replace("&", "\\&")
-    text = text.replace("<", "\\<")
-    text = text.replace(">", "\\>")
-
-    text = text.replace("{", "\\{")
-    text = text.replace("}", "\\}")
-
-    text = text.replace("*", "\\*")
-    text = text.replace("_", "\\_")
-    text = text.replace("`", "\\`")
-    return text
+from src.escaping import code_span, js_string, jsx_attribute, mdx_text, template_literal
+from src.fragment_cache import FragmentCache
+from src.html_tree import Element, Text, escape_unknown_references, parse_fragment
+from src.manifest import hash_files, hash_json, hash_text
+
+PARSER_BACKENDS = ("html.parser", "lxml", "fast")
+HIGHLIGHT_MODES = ("shiki", "typst")
+HIGHLIGHT_PREFIX = "typ-"
+INLINE_CODE = re.compile(r"<TypstCode inline tokens=\{(\[.*?\])\} />")
+ASSET_PREFIX = "/assets/"
+ASSET_SRC = re.compile(r"""/assets/([^'"\s)]+)""")
+ANCHOR_HREF = re.compile(r"""href=["'](/[^"'#]*)#([^"']+)["']""")
+TEXT_TYPES = (NavigableString, Text)
+TAG_TYPES = (Tag, Element)
+
+OPTIONS = {
+    "parser": "html.parser",
+    "highlight": "shiki",
+}
+
+SOURCE_FINGERPRINT = hash_files(Path(__file__), Path(__file__).with_name("html_tree.py"), Path(__file__).with_name("escaping.py"))
+
+def converter_version() -> str:
+    return hash_json([SOURCE_FINGERPRINT, OPTIONS])
+
+FRAGMENT_CACHE = FragmentCache()
+FRAGMENT_CACHE.set_version(converter_version())
+STATS = {"parses": 0}
+
+class Emitted(threading.local):
+    # Per-thread state of the fragment being converted, the defaults let convert_html run on its own.
+    def __init__(self) -> None:
+        self.reset()
+
+    def reset(self, images: dict[str, dict] | None = None, links: dict[str, str] | None = None) -> None:
+        self.components: set[str] = set()
+        self.images = images or {}
+        self.links = links or {}
+
+EMITTED = Emitted()
+
+def configure(options: dict) -> None:
+    parser = options.get("parser", OPTIONS["parser"])
+    if parser not in PARSER_BACKENDS:
+        raise ValueError(f"Unknown HTML parser backend: {parser}")
+    if options.get("highlight", OPTIONS["highlight"]) not in HIGHLIGHT_MODES:
+        raise ValueError(f"Unknown highlight mode: {options['highlight']}")
+    if parser == "lxml":
+        try:
+            import lxml  # noqa: F401
+        except ImportError:
+            logger.warning("lxml is not installed, falling back to html.parser")
+            parser = "html.parser"
+    OPTIONS.update(options, parser=parser)
+    FRAGMENT_CACHE.set_version(converter_version())
 
 def process_footnote_definition(element: Tag) -> str:
     fn_id = element.get("id")
     
     label = element.find(class_="footnote-definition-label")
-    if label and isinstance(label, Tag):
+    if label and isinstance(label, TAG_TYPES):
         label.decompose()
 
     content = "".join([process_inline(child) for child in element.children]).strip()
@@ -48,17 +92,67 @@ def parse_style_to_jsx(style_str: str) -> str:
             parts = prop.split('-')
             prop = parts[0] + ''.join(p.capitalize() for p in parts[1:])
         
-        val = val.replace("'", "\\'")
+        val = js_string(val)
         
         jsx_props.append(f"{prop}: '{val}'")
         
     return "{{" + ", ".join(jsx_props) + "}}"
 
-def html_to_mdx(html_content: str) -> str:
+def parse_html(html_content: str):
+    STATS["parses"] += 1
+    html_content = escape_unknown_references(html_content)
+    if OPTIONS["parser"] == "fast":
+        return parse_fragment(html_content)
+    return BeautifulSoup(html_content, OPTIONS["parser"])
+
+def use_component(name: str) -> None:
+    EMITTED.components.add(name)
+
+def fragment_images(html_content: str, images: dict[str, dict] | None) -> dict[str, dict]:
+    if not images or ASSET_PREFIX not in html_content:
+        return {}
+    return {name: images[name] for name in ASSET_SRC.findall(html_content) if name in images}
+
+def link_key(path: str, anchor: str) -> str:
+    return f"{path.strip('/')}#{anchor}"
+
+def fragment_links(html_content: str, links: dict[str, str] | None) -> dict[str, str]:
+    if not links or "#" not in html_content:
+        return {}
+    keys = (link_key(path, anchor) for path, anchor in ANCHOR_HREF.findall(html_content))
+    return {key: links[key] for key in keys if key in links}
+
+def image_metadata(src: str) -> dict | None:
+    return EMITTED.images.get(src.removeprefix(ASSET_PREFIX)) if src.startswith(ASSET_PREFIX) else None
+
+def fragment_key(html_content: str, images: dict[str, dict] | None = None, links: dict[str, str] | None = None) -> tuple[str, dict[str, dict], dict[str, str]]:
+    key = hash_text(html_content)
+    # Sizes of the referenced images and targets of moved anchors are part of the output, so they are part of the key.
+    used_images = fragment_images(html_content, images)
+    used_links = fragment_links(html_content, links)
+    if used_images or used_links:
+        key = hash_json([key, used_images, used_links])
+    return key, used_images, used_links
+
+def convert_fragment(html_content: str, images: dict[str, dict] | None = None, links: dict[str, str] | None = None) -> tuple[str, tuple[str, ...]]:
     if not html_content:
-        return ""
-        
-    soup = BeautifulSoup(html_content, "html.parser")
+        return "", ()
+
+    key, used_images, used_links = fragment_key(html_content, images, links)
+    cached = FRAGMENT_CACHE.get(key)
+    if cached is not None:
+        return cached[0], tuple(cached[1])
+    EMITTED.reset(used_images, used_links)
+    result = convert_html(html_content)
+    components = tuple(sorted(EMITTED.components))
+    FRAGMENT_CACHE.put(key, [result, list(components)])
+    return result, components
+
+def html_to_mdx(html_content: str, images: dict[str, dict] | None = None, links: dict[str, str] | None = None) -> str:
+    return convert_fragment(html_content, images, links)[0]
+
+def convert_html(html_content: str) -> str:
+    soup = parse_html(html_content)
     
     for h1 in soup.find_all("h1"):
         h1.decompose()
@@ -72,7 +166,51 @@ def html_to_mdx(html_content: str) -> str:
 
     return "\n\n".join(output)
 
+def highlight_scope(classes: list[str]) -> list[str]:
+    return [cls.removeprefix(HIGHLIGHT_PREFIX) for cls in classes if cls.startswith(HIGHLIGHT_PREFIX)]
+
+def code_tokens(element: Tag, scope: tuple[str, ...] = (), tokens: list[list[str]] | None = None) -> list[list[str]]:
+    tokens = [] if tokens is None else tokens
+    for child in element.children:
+        if isinstance(child, TEXT_TYPES):
+            text = str(child)
+            token = [text, " ".join(scope)] if scope else [text]
+            if tokens and tokens[-1][1:] == token[1:]:
+                tokens[-1][0] += text
+            elif text:
+                tokens.append(token)
+        elif isinstance(child, TAG_TYPES):
+            code_tokens(child, scope + tuple(highlight_scope(child.get("class") or [])), tokens)
+    return tokens
+
+def element_tokens(element: Tag) -> list[list[str]]:
+    tokens = code_tokens(element)
+    while tokens and not tokens[-1][0].rstrip():
+        tokens.pop()
+    if tokens:
+        tokens[-1][0] = tokens[-1][0].rstrip()
+    return tokens
+
+def tokens_expression(tokens: list[list[str]]) -> str:
+    # Pipes are escaped so the expression cannot end a GFM table cell.
+    return "{" + json.dumps(tokens, ensure_ascii=False, separators=(",", ":")).replace("|", "\\u007c") + "}"
+
+def render_tokens(tokens: list[list[str]], inline: bool = False) -> str:
+    use_component("TypstCode")
+    return f"<TypstCode{' inline' if inline else ''} tokens={tokens_expression(tokens)} />"
+
+def highlighted_code(element: Tag, inline: bool = False) -> str:
+    return render_tokens(element_tokens(element), inline)
+
+def plain_inline_code(text: str) -> str:
+    # String props such as TypeTable descriptions are not compiled as MDX, keep inline code readable there.
+    if "<TypstCode" not in text:
+        return text
+    return INLINE_CODE.sub(lambda match: "`" + "".join(token[0] for token in json.loads(match[1])) + "`", text)
+
 def process_pre(element: Tag) -> str:
+    if OPTIONS["highlight"] == "typst":
+        return highlighted_code(element)
     code_content = element.get_text()
     language = "typst"
     
@@ -121,7 +259,7 @@ def process_list(element: Tag, depth: int = 0) -> str:
         li_content_parts = []
         
         for sub_child in child.children:
-            if isinstance(sub_child, Tag) and sub_child.name in ["ul", "ol"]:
+            if isinstance(sub_child, TAG_TYPES) and sub_child.name in ["ul", "ol"]:
                 nested_list = process_list(sub_child, depth + 1)
                 li_content_parts.append("\n" + nested_list)
             else:
@@ -144,20 +282,40 @@ def process_preview_code(element: Tag) -> str:
     if not pre_block:
         return ""
     code_text = pre_block.get_text().rstrip()
+    highlight = OPTIONS["highlight"] == "typst"
     if not image_block:
-        return f"```typst\n{code_text}\n```"
+        return highlighted_code(pre_block) if highlight else f"```typst\n{code_text}\n```"
     if image_block and pre_block:
-        if not isinstance(image_block, Tag):
+        if not isinstance(image_block, TAG_TYPES):
             logger.warning(f"Skipping unsupported image block: {image_block}")
             return ""
-        src = image_block.get('src', "")
-        alt = image_block.get('alt', "")
-        code_text = code_text.replace("`", "\\`")
+        image = image_metadata(image_block.get('src', ""))
+        src = jsx_attribute(image_block.get('src', ""))
+        alt = jsx_attribute(image_block.get('alt', ""))
+        code_text = template_literal(code_text)
         code_text = textwrap.indent(code_text, "  ")
         code_text = "{" + f"`\n{code_text}\n`" + "}"
-        return f"<TypstPreview\n  code={code_text}\n  image='{src}'\n  alt='{alt}'\n  editable={{true}}\n/>"
+        use_component("TypstPreview")
+        tokens = f"  tokens={tokens_expression(element_tokens(pre_block))}\n" if highlight else ""
+        return f"<TypstPreview\n  code={code_text}\n{tokens}  image='{src}'\n{preview_image_props(image)}  alt='{alt}'\n  editable={{true}}\n/>"
     return ""
 
+def docs_href(href: str) -> str:
+    if not href.startswith("/"):
+        return href
+    path, _, anchor = href.partition("#")
+    # Definitions of split pages moved to sub-pages, see src.page_split.
+    moved = EMITTED.links.get(link_key(path, anchor)) if anchor else None
+    return f"/docs/{moved}/" if moved else "/docs" + href
+
+def preview_image_props(image: dict | None) -> str:
+    if not image:
+        return ""
+    props = f"  width={{{image['width']}}}\n  height={{{image['height']}}}\n  hash='{image['hash']}'\n"
+    if image.get("placeholder"):
+        props += f"  placeholder='{image['placeholder']}'\n"
+    return props
+
 def process_info_box(element: Tag) -> str:
     children_processed = [process_element(child) for child in element.children]
     inner_content = "\n\n".join(filter(None, children_processed))
@@ -169,11 +327,11 @@ def process_heading(element: Tag) -> str:
     return f"{'#' * level} {text}"
 
 def process_element(element):
-    if isinstance(element, NavigableString):
+    if isinstance(element, TEXT_TYPES):
         text = str(element).strip()
-        return escape_mdx_text(text) if text else None
+        return mdx_text(text) if text else None
 
-    if isinstance(element, Tag):
+    if isinstance(element, TAG_TYPES):
         classes = element.get("class") or []
 
         if element.name == "div":
@@ -201,8 +359,7 @@ def process_element(element):
             href = element.get("href", "")
             if isinstance(href, list):
                 href = "".join([process_inline(child) for child in href])
-            if href.startswith("/"):
-                href = "/docs" + href
+            href = docs_href(href)
             text = "".join([process_inline(child) for child in element.children]).strip()
             return f"[{text}]({href})"
 
@@ -213,6 +370,8 @@ def process_element(element):
             return process_heading(element)
         
         if element.name == "code" and element.parent.name != "pre":
+            if OPTIONS["highlight"] == "typst":
+                return highlighted_code(element, inline=True)
             language = "typst"
             text = element.get_text().rstrip()
             return f'`{text}{{:{language}}}`'
@@ -237,13 +396,13 @@ def process_element(element):
     return None
 
 def process_inline(element):
-    if isinstance(element, NavigableString):
-        return escape_mdx_text(str(element).replace("\n", " "))
+    if isinstance(element, TEXT_TYPES):
+        return mdx_text(str(element).replace("\n", " "))
     
-    if isinstance(element, Tag):
+    if isinstance(element, TAG_TYPES):
         if element.name == "img":
-            src = element.get("src", "")
-            alt = element.get("alt", "")
+            src = jsx_attribute(element.get("src", ""))
+            alt = jsx_attribute(element.get("alt", ""))
             style = element.get("style")
             
             attrs = f'src="{src}" alt="{alt}"'
@@ -252,8 +411,14 @@ def process_inline(element):
                 jsx_style = parse_style_to_jsx(style)
                 attrs += f' style={jsx_style}'
             
-            if element.get("width"): attrs += f' width="{element.get("width")}"'
-            if element.get("height"): attrs += f' height="{element.get("height")}"'
+            if element.get("width"): attrs += f' width="{jsx_attribute(element.get("width"))}"'
+            if element.get("height"): attrs += f' height="{jsx_attribute(element.get("height"))}"'
+
+            image = image_metadata(element.get("src", ""))
+            if image:
+                if not element.get("width") and not element.get("height"):
+                    attrs += f' width="{image["width"]}" height="{image["height"]}"'
+                attrs += ' loading="lazy" decoding="async"'
 
             return f"<img {attrs} />"
         
@@ -264,8 +429,7 @@ def process_inline(element):
             href = element.get("href", "")
             if isinstance(href, list):
                 href = "".join([process_inline(child) for child in href])
-            if href.startswith("/"):
-                href = "/docs" + href
+            href = docs_href(href)
             text = "".join([process_inline(child) for child in element.children]).strip()
             return f"[{text}]({href})"
             
@@ -276,9 +440,11 @@ def process_inline(element):
             return f"_{element.get_text()}_"
             
         if element.name == "code":
+            if OPTIONS["highlight"] == "typst":
+                return highlighted_code(element, inline=True)
             language = "typst"
             text = element.get_text().strip()
-            text = text.replace("{", "\\{").replace("}", "\\}")
+            text = code_span(text)
             if text == "`":
                 return "```"
             return f'`{text}{{:{language}}}`'
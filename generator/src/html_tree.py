@@ -0,0 +1,196 @@
+import re
+from html import unescape
+from html.entities import html5
+from html.parser import HTMLParser
+
+VOID_ELEMENTS = frozenset([
+    "area", "base", "basefont", "bgsound", "br", "col", "command", "embed", "frame", "hr",
+    "image", "img", "input", "isindex", "keygen", "link", "menuitem", "meta", "nextid",
+    "param", "source", "spacer", "track", "wbr",
+])
+PRESERVE_WHITESPACE_ELEMENTS = frozenset(["pre", "textarea"])
+ASCII_SPACES = frozenset("\x20\x0a\x09\x0c\x0d")
+NAMED_REFERENCE = re.compile(r"&([A-Za-z][A-Za-z0-9]*;)")
+
+
+def escape_xml(text: str) -> str:
+    return text.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+
+
+def escape_unknown_references(html_content: str) -> str:
+    # html.parser drops the semicolon of unknown references and lxml decodes known prefixes (&notanentity; -> ¬anentity;),
+    # escaping them first makes every backend keep the text as written.
+    if "&" not in html_content:
+        return html_content
+    return NAMED_REFERENCE.sub(lambda match: match[0] if match[1] in html5 else f"&amp;{match[1]}", html_content)
+
+
+def quote_attribute(value: str) -> str:
+    value = escape_xml(value)
+    if '"' not in value:
+        return f'"{value}"'
+    if "'" not in value:
+        return f"'{value}'"
+    return '"' + value.replace('"', "&quot;") + '"'
+
+
+class Text(str):
+    parent = None
+
+
+class Comment(Text):
+    pass
+
+
+class Element:
+    __slots__ = ("name", "attrs", "contents", "parent")
+
+    def __init__(self, name: str, attrs: dict, parent: "Element | None" = None):
+        self.name = name
+        self.attrs = attrs
+        self.contents = []
+        self.parent = parent
+
+    @property
+    def children(self):
+        return iter(self.contents)
+
+    @property
+    def body(self) -> "Element | None":
+        return self.find("body")
+
+    def get(self, key: str, default=None):
+        return self.attrs.get(key, default)
+
+    def descendants(self):
+        for child in self.contents:
+            yield child
+            if isinstance(child, Element):
+                yield from child.descendants()
+
+    def find_all(self, name: str | list[str] | None = None, recursive: bool = True, class_: str | None = None) -> list["Element"]:
+        names = [name] if isinstance(name, str) else name
+        candidates = self.descendants() if recursive else self.contents
+        return [
+            child for child in candidates
+            if isinstance(child, Element)
+            and (names is None or child.name in names)
+            and (class_ is None or class_ in (child.attrs.get("class") or []))
+        ]
+
+    def find(self, name: str | list[str] | None = None, class_: str | None = None) -> "Element | None":
+        found = self.find_all(name, class_=class_)
+        return found[0] if found else None
+
+    def get_text(self, separator: str = "", strip: bool = False) -> str:
+        strings = (child for child in self.descendants() if isinstance(child, Text) and not isinstance(child, Comment))
+        if strip:
+            return separator.join(stripped for stripped in (string.strip() for string in strings) if stripped)
+        return separator.join(strings)
+
+    def decompose(self) -> None:
+        if self.parent is not None:
+            self.parent.contents.remove(self)
+            self.parent = None
+
+    def serialize(self, parts: list[str]) -> None:
+        parts.append(f"<{self.name}")
+        for key, value in sorted(self.attrs.items()):
+            if isinstance(value, list):
+                value = " ".join(value)
+            parts.append(f" {key}={quote_attribute(value)}")
+        if self.name in VOID_ELEMENTS and not self.contents:
+            parts.append("/>")
+            return
+        parts.append(">")
+        for child in self.contents:
+            if isinstance(child, Element):
+                child.serialize(parts)
+            elif isinstance(child, Comment):
+                parts.append(f"<!--{child}-->")
+            else:
+                parts.append(escape_xml(child))
+        parts.append(f"</{self.name}>")
+
+    def __str__(self) -> str:
+        parts = []
+        self.serialize(parts)
+        return "".join(parts)
+
+
+class FragmentBuilder(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=False)
+        self.root = Element("[document]", {})
+        self.stack = [self.root]
+        self.data = []
+        self.preserve_whitespace = 0
+
+    def flush(self) -> None:
+        if not self.data:
+            return
+        text = "".join(self.data)
+        self.data = []
+        if not self.preserve_whitespace and all(char in ASCII_SPACES for char in text):
+            text = "\n" if "\n" in text else " "
+        self.append(Text(text))
+
+    def append(self, node) -> None:
+        parent = self.stack[-1]
+        node.parent = parent
+        parent.contents.append(node)
+
+    def open_element(self, tag: str, attrs: list[tuple[str, str | None]]) -> Element:
+        self.flush()
+        attr_dict = {}
+        for key, value in attrs:
+            value = value or ""
+            attr_dict[key] = value.split() if key == "class" else value
+        element = Element(tag, attr_dict)
+        self.append(element)
+        return element
+
+    def handle_starttag(self, tag, attrs):
+        element = self.open_element(tag, attrs)
+        if tag in VOID_ELEMENTS:
+            return
+        self.stack.append(element)
+        if tag in PRESERVE_WHITESPACE_ELEMENTS:
+            self.preserve_whitespace += 1
+
+    def handle_startendtag(self, tag, attrs):
+        self.open_element(tag, attrs)
+
+    def handle_endtag(self, tag):
+        self.flush()
+        if tag in VOID_ELEMENTS:
+            return
+        for index in range(len(self.stack) - 1, 0, -1):
+            if self.stack[index].name == tag:
+                for element in self.stack[index:]:
+                    if element.name in PRESERVE_WHITESPACE_ELEMENTS:
+                        self.preserve_whitespace -= 1
+                del self.stack[index:]
+                return
+
+    def handle_data(self, data):
+        self.data.append(data)
+
+    def handle_entityref(self, name):
+        self.data.append(html5.get(f"{name};", f"&{name}"))
+
+    def handle_charref(self, name):
+        # unescape applies the HTML5 replacements for NUL, surrogates, out of range and windows-1252 code points.
+        self.data.append(unescape(f"&#{name};"))
+
+    def handle_comment(self, data):
+        self.flush()
+        self.append(Comment(data))
+
+
+def parse_fragment(html_content: str) -> Element:
+    builder = FragmentBuilder()
+    builder.feed(html_content)
+    builder.close()
+    builder.flush()
+    return builder.root
@@ -0,0 +1,35 @@
+# The chained str.replace calls src.escaping replaced, kept as the reference the tests check its output against and
+# the bench compares its speed with.
+def legacy_mdx_text(text: str) -> str:
+    text = text.replace("\\", "\\\\")
+    text = text.replace("&", "\\&")
+    text = text.replace("<", "\\<")
+    text = text.replace(">", "\\>")
+    text = text.replace("{", "\\{")
+    text = text.replace("}", "\\}")
+    text = text.replace("*", "\\*")
+    text = text.replace("_", "\\_")
+    text = text.replace("`", "\\`")
+    return text
+
+
+def legacy_code_span(text: str) -> str:
+    return text.replace("{", "\\{").replace("}", "\\}")
+
+
+def legacy_js_string(text: str) -> str:
+    if not text:
+        return ""
+    return text.replace("\\", "\\\\").replace("'", "\\'").replace('\n', ' ')
+
+
+def legacy_table_cell(text: str) -> str:
+    return f"\\{text}" if text in ["|", "`", "'", '"', "\\", "{", "}", "<", ">"] else text
+
+
+LEGACY = {
+    "mdx_text": legacy_mdx_text,
+    "code_span": legacy_code_span,
+    "js_string": legacy_js_string,
+    "table_cell": legacy_table_cell,
+}
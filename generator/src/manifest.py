@@ -0,0 +1,101 @@
+import hashlib
+import json
+from pathlib import Path
+from loguru import logger
+
+
+def hash_bytes(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def hash_text(text: str) -> str:
+    return hash_bytes(text.encode("utf-8"))
+
+
+def json_default(value) -> dict:
+    # Slots dataclasses from src.schema serialize as their fields.
+    if hasattr(value, "__slots__"):
+        return {name: getattr(value, name) for name in value.__slots__}
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def hash_json(data) -> str:
+    return hash_text(json.dumps(data, sort_keys=True, ensure_ascii=False, default=json_default))
+
+
+def hash_files(*paths: Path) -> str:
+    digest = hashlib.sha256()
+    for path in paths:
+        digest.update(path.read_bytes())
+    return digest.hexdigest()
+
+
+def write_if_changed(file_path: Path, content: str) -> int:
+    data = content.encode("utf-8")
+    if file_path.is_file() and file_path.read_bytes() == data:
+        return 0
+    file_path.parent.mkdir(parents=True, exist_ok=True)
+    return file_path.write_bytes(data)
+
+
+class BuildManifest:
+    def __init__(self, path: Path | None, fingerprint: str):
+        self.path = path
+        self.fingerprint = fingerprint
+        self.previous: dict[str, dict] = {}
+        self.pages: dict[str, dict] = {}
+        self.reuse = False
+        if path and path.is_file():
+            try:
+                data = json.loads(path.read_text(encoding="utf-8"))
+            except json.JSONDecodeError:
+                logger.warning(f"Ignoring corrupted manifest {path}")
+                return
+            # The previous file lists are needed to remove stale outputs either way, the fingerprint only decides
+            # whether the recorded input hashes can be trusted.
+            self.previous = data.get("pages", {})
+            self.reuse = data.get("fingerprint") == fingerprint
+            if not self.reuse:
+                logger.info("Converter changed since last run, re-rendering all pages")
+
+    def is_fresh(self, key: str, input_hash: str, output_path: Path) -> bool:
+        if not self.reuse:
+            return False
+        entry = self.previous.get(key)
+        if not entry or entry["input"] != input_hash:
+            return False
+        return all((output_path / file).is_file() for file in entry["files"])
+
+    def keep(self, key: str) -> None:
+        self.pages[key] = self.previous[key]
+
+    def update(self, key: str, input_hash: str, files: dict[str, str]) -> None:
+        self.pages[key] = {
+            "input": input_hash,
+            "files": {file: hash_text(content) for file, content in files.items()},
+        }
+
+    def stale_files(self) -> list[str]:
+        current = {file for entry in self.pages.values() for file in entry["files"]}
+        previous = {file for entry in self.previous.values() for file in entry["files"]}
+        return sorted(previous - current)
+
+    def save(self) -> None:
+        if not self.path:
+            return
+        data = {"fingerprint": self.fingerprint, "pages": self.pages}
+        write_if_changed(self.path, json.dumps(data, indent=1, sort_keys=True) + "\n")
+
+
+def remove_stale_files(manifest: BuildManifest, output_path: Path) -> int:
+    removed = 0
+    for file in manifest.stale_files():
+        file_path = output_path / file
+        if file_path.is_file():
+            file_path.unlink()
+            removed += 1
+        parent = file_path.parent
+        while parent != output_path and parent.is_dir() and not any(parent.iterdir()):
+            parent.rmdir()
+            parent = parent.parent
+    return removed
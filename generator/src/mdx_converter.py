@@ -1,164 +1,262 @@
 import json
-from typing import Callable, Union
+import os
+import posixpath
+import re
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from itertools import batched
+from typing import Callable, Generator, Iterable, Iterator
 from pathlib import Path
 from loguru import logger
-from src.html_to_mdx import html_to_mdx
-
-def js_escape(text: str) -> str:
-    if not text:
-        return ""
-    return text.replace("\\", "\\\\").replace("'", "\\'").replace('\n', ' ')
-
-def render_generic(details: Union[str, list, dict]) -> str:
-    if not details:
-        return ""
-    
-    if isinstance(details, str):
-        return html_to_mdx(details)
-    
-    if isinstance(details, list):
-        result = []
-        for item in details:
-            if isinstance(item, dict):
-                kind = item.get("kind") or "html"
-                content = item.get("content")
-                if kind == "html":
-                    content = content or ""
-                    result.append(html_to_mdx(content))
-                elif kind == "example":
-                    content = content or {}
-                    ex_body = content.get("body", "")
-                    result.append(html_to_mdx(ex_body))
-            elif isinstance(item, str):
-                result.append(html_to_mdx(item))
-        return "\n\n".join(result)
-        
-    return ""
-
-def render_type_table(params: list[dict]) -> str:
-    if not params:
-        return ""
-    
-    entries = []
+from src import html_to_mdx as html_converter
+from src.escaping import js_string, quoted_string, table_cell
+from src.mdx_writer import SIDECAR_NAME, FragmentRecorder, MdxWriter
+from src.metrics import METRICS
+from src.output_writer import StagedWriter
+from src.page_split import PAGE_BUDGET, moved_anchors, page_cost, split_page
+from src.partials import DESCRIPTION, PARTIAL_MIN_SIZE, PARTIALS_DIR, Partial, collect_partials, page_partials, partial_key
+from src.route_filter import RouteFilter
+from src.schema import Body, Category, Details, Func, Group, Index, Page, Param, SchemaError, Symbols, Type, decode_children
+from src.search_index import SEARCH_STATE_FILE, SearchIndex
+from src.manifest import BuildManifest, hash_files, hash_json, json_default
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+STREAMING_AVAILABLE = ijson is not None
+
+CONVERTER_FINGERPRINT = hash_files(Path(__file__), Path(__file__).with_name("mdx_writer.py"), Path(__file__).with_name("page_split.py"), Path(__file__).with_name("partials.py"))
+ASSET_URL = re.compile(r"""/assets/([^'"\s)]+)""")
+# Asset URLs and anchor links inside JSON encoded page data, where quotes are escaped.
+ASSET_REFERENCE = re.compile(r"""/assets/([^'"\s)\\]+)""")
+ANCHOR_REFERENCE = re.compile(r"""href=\\?["'](/[^"'#\\]*)#([^"'\\]+)""")
+TYPE_TABLE_MODES = ("inline", "sidecar")
+SIDECAR_SUFFIX = ".types.json"
+
+def write_generic(out: MdxWriter, details: Details) -> None:
+    separator = ""
+    for html in details:
+        out.write(separator)
+        out.html(html)
+        separator = "\n\n"
+
+def write_shared(out: MdxWriter, details: Details) -> None:
+    # Blocks repeated across pages are rendered once into a partial, see src.partials.
+    if out.partials and sum(map(len, details)) >= PARTIAL_MIN_SIZE and out.include(partial_key(details)):
+        return
+    write_generic(out, details)
+
+def render_generic(details: Details) -> str:
+    out = MdxWriter()
+    write_generic(out, details)
+    return out.getvalue()
+
+def param_description(out: MdxWriter, details: Details) -> str:
+    captured = out.fork()
+    write_generic(captured, details)
+    return html_converter.plain_inline_code(captured.getvalue().strip())
+
+def shared_description(out: MdxWriter, details: Details) -> str | None:
+    if out.partials and sum(map(len, details)) >= PARTIAL_MIN_SIZE:
+        return out.shared_value(partial_key(details, DESCRIPTION))
+    return None
+
+def write_sidecar_type_table(out: MdxWriter, params: tuple[Param, ...], key: str) -> None:
+    rows = {}
     for param in params:
-        name = param["name"]
-        
-        type_str = " | ".join([t for t in param.get('types', [])])
-        
-        raw_desc = render_generic(param.get('details', '')).strip()
-        desc = js_escape(raw_desc)
-        
-        fields = []
-        fields.append(f"      'description': '{desc}'")
-        fields.append(f"      'type': '{type_str}'")
-        
-        if "default" in param:
-            def_val = js_escape(str(param["default"]))
-            fields.append(f"      'default': '{def_val}'")
-            
-        fields_str = ",\n".join(fields)
-        
-        entries.append(f"    '{name}': {{\n{fields_str}\n    }}")
-    
-    props = ",\n".join(entries)
-    return f"""
-<TypeTable
-  type={{{{
-{props}
-  }}}}
-/>
-"""
+        row = {"description": param_description(out, param.details), "type": " | ".join(param.types)}
+        if param.default is not None:
+            row["default"] = param.default
+        rows[param.name] = row
+    out.write(f"\n<TypeTable type={{{SIDECAR_NAME}[{json.dumps(out.table(key, rows))}]}} />\n")
 
-def render_func(func: dict, heading_level: int = 2) -> str:
+def write_type_table(out: MdxWriter, params: tuple[Param, ...], key: str = "") -> None:
+    if not params:
+        return
+
+    out.use("TypeTable")
+    if out.sidecar:
+        write_sidecar_type_table(out, params, key)
+        return
+    out.write("\n<TypeTable\n  type={{\n")
+    for index, param in enumerate(params):
+        name = param.name
+
+        type_str = " | ".join(param.types)
+
+        desc = shared_description(out, param.details) or f"'{js_string(param_description(out, param.details))}'"
+
+        if index:
+            out.write(",\n")
+        out.write(f"    '{name}': {{\n", f"      'description': {desc}", ",\n", f"      'type': '{type_str}'")
+        if param.default is not None:
+            def_val = js_string(param.default)
+            out.write(",\n", f"      'default': '{def_val}'")
+        out.write("\n    }")
+    out.write("\n  }}\n/>\n")
+
+def signature_tokens(func: Func, path: str) -> list[list[str]]:
+    tokens = [[f"#{path}", "func"], ["(\n"]]
+    for index, param in enumerate(func.params):
+        tokens.append([f"{',\n' if index else ''}  {param.name}"])
+        if param.named:
+            tokens.extend([[": "], [" | ".join(param.types), "type"]])
+    tokens.append(["\n)"])
+    if func.returns is not None:
+        tokens.extend([[" -> "], [" ".join(func.returns), "type"]])
+    return tokens
+
+def write_func(out: MdxWriter, func: Func, heading_level: int = 2) -> None:
     head = "#" * heading_level
-    name = func['name']
-    path = ".".join(func.get('path', []) + [name])
-    
-    result = ""
-    result += render_generic(func.get("details", "")) + "\n\n"
-    
+    path = func.qualified_name
+
+    write_shared(out, func.details)
+    out.write("\n\n")
+
     params_sig = []
-    for p in func.get("params", []):
-        param = "  " + p['name']
-        if p.get('named'):
+    for p in func.params:
+        param = "  " + p.name
+        if p.named:
             param += ":"
-            p_types = " | ".join(p.get('types', []))
+            p_types = " | ".join(p.types)
             param += f" {p_types}"
         params_sig.append(param)
 
-    if func.get("params"):
-        signature = f"#{path}(\n{',\n'.join(params_sig)}\n)"
-        if 'returns' in func:
-            signature += f" -> {' '.join(func['returns'])}"
-        result += f"```typst\n{signature}\n```"
-        result += f"\n{head} Parameters\n"
-        result += render_type_table(func["params"]) + "\n"
-
-    if func.get("example"):
-        result += "\n**Example:**\n"
-        ex = func["example"]
-        if isinstance(ex, dict) and "body" in ex:
-             result += html_to_mdx(ex["body"]) + "\n"
+    if func.params:
+        if html_converter.OPTIONS["highlight"] == "typst":
+            out.use("TypstCode")
+            out.write(f"<TypstCode tokens={html_converter.tokens_expression(signature_tokens(func, path))} />")
         else:
-             result += render_generic(ex) + "\n"
-
-    if func.get("scope"):
-        result += f"\n{head}# Definitions\n"
-        for scope_func in func["scope"]:
-            result += render_func(scope_func, heading_level + 1)
-
-    return result
-
-def get_pages_recursive(json_data: dict, result_list: list, on_item_processed: Callable | None = None) -> None:
-    title = json_data.get("title")
-    route = json_data.get("route")
-    if route:
-        route = route.strip("/")
-
-    description = json_data.get("description")
-    if description:
-        description = description.replace("\n", " ").strip()
-
-    part = json_data.get("part")
-    body = json_data.get("body")
-    has_children = bool(json_data.get("children"))
-    children_order = [elem.get("route").split("/")[-2] for elem in json_data.get("children") or []]
-    
-    result_list.append({
-        "title": title,
-        "route": route,
-        "description": description,
-        "part": part,
-        "body": body,
-        "has_children": has_children,
-        "children_order": children_order
-    })
+            signature = f"#{path}(\n{',\n'.join(params_sig)}\n)"
+            if func.returns is not None:
+                signature += f" -> {' '.join(func.returns)}"
+            out.write(f"```typst\n{signature}\n```")
+        out.write(f"\n{head} Parameters\n")
+        write_type_table(out, func.params, path)
+        out.write("\n")
+
+    if func.example:
+        out.write("\n**Example:**\n")
+        write_shared(out, func.example)
+        out.write("\n")
+
+    if func.scope:
+        out.write(f"\n{head}# Definitions\n")
+        for scope_func in func.scope:
+            write_func(out, scope_func, heading_level + 1)
+
+def get_pages_recursive(json_data: dict, result_list: list, on_item_processed: Callable | None = None, routes: RouteFilter | None = None) -> None:
+    route = (json_data.get("route") or "").strip("/")
+    if routes and not routes.visits(route):
+        return
+    if not routes or routes.selects(route):
+        result_list.append(Page.decode(json_data, [child.get("route") for child in json_data.get("children") or []]))
 
     if on_item_processed:
-        on_item_processed(title)
+        on_item_processed(json_data.get("title"))
 
     for children in json_data.get("children", []):
-        get_pages_recursive(children, result_list, on_item_processed)
+        get_pages_recursive(children, result_list, on_item_processed, routes)
+
+def read_json_value(events: Iterator[tuple[str, object]], event: str, value: object) -> object:
+    builder = ijson.ObjectBuilder()
+    builder.event(event, value)
+    depth = 1 if event in ("start_map", "start_array") else 0
+    while depth:
+        event, value = next(events)
+        builder.event(event, value)
+        if event in ("start_map", "start_array"):
+            depth += 1
+        elif event in ("end_map", "end_array"):
+            depth -= 1
+    return builder.value
+
+def skip_json_value(events: Iterator[tuple[str, object]], event: str) -> None:
+    depth = 1 if event in ("start_map", "start_array") else 0
+    while depth:
+        event, _ = next(events)
+        if event in ("start_map", "start_array"):
+            depth += 1
+        elif event in ("end_map", "end_array"):
+            depth -= 1
+
+def stream_page_tree(events: Iterator[tuple[str, object]], routes: RouteFilter | None = None) -> Generator[Page, None, object]:
+    fields = {}
+    child_routes = []
+    visits = selects = True
+    for event, key in events:
+        if event == "end_map":
+            break
+        event, value = next(events)
+        # Once the route is known, fields of pages that are not rendered are skipped without being built.
+        if not selects and key != "children" or not visits:
+            skip_json_value(events, event)
+            continue
+        if key != "children" or event != "start_array":
+            fields[key] = read_json_value(events, event, value)
+            if key == "route" and routes:
+                route = (fields["route"] or "").strip("/")
+                visits, selects = routes.visits(route), routes.selects(route)
+            continue
+        for event, _ in events:
+            if event == "end_array":
+                break
+            child_routes.append((yield from stream_page_tree(events, routes)))
+    if selects and visits:
+        yield Page.decode(fields, child_routes)
+    return fields.get("route")
+
+def normalize_root(root_page: Page, top_level_routes: list) -> None:
+    # The root page lists the other top-level pages of output.json as its children.
+    try:
+        root_page.children_order = decode_children(top_level_routes)
+    except SchemaError as error:
+        raise SchemaError(f"page /: {error}") from None
+    root_page.has_children = bool(root_page.children_order)
 
-def render_category(category: dict) -> str:
-    details = render_generic(category.get("details", ""))
+def stream_pages(input_json: Path, routes: RouteFilter | None = None) -> Iterator[Page]:
+    if ijson is None:
+        raise RuntimeError("Streaming mode requires the ijson package")
 
-    items = category.get("items", [])
+    count = 0
+    root_page = None
+    top_level_routes = []
+    with input_json.open("rb") as file:
+        events = iter(ijson.basic_parse(file, use_float=True))
+        next(events)
+        for event, _ in events:
+            if event == "end_array":
+                break
+            pages = stream_page_tree(events, routes)
+            while True:
+                try:
+                    page = next(pages)
+                except StopIteration as stop:
+                    top_level_routes.append(stop.value)
+                    break
+                count += 1
+                if page.route:
+                    yield page
+                else:
+                    root_page = page
+
+    if root_page:
+        normalize_root(root_page, top_level_routes[1:])
+        yield root_page
+    logger.info(f"Streamed {count} pages")
+
+def write_category(out: MdxWriter, category: Category) -> None:
+    write_generic(out, category.details)
+
+    items = category.items
 
     if not items:
-        return details
-    
-    rows = "\n".join(
-        f'    <tr>\n'
-        f'      <td width="20px" align="center">—</td>\n'
-        f'      <td><code><a href="{item["route"]}">{item["name"]}</a></code></td>\n'
-        f'      <td>{item["oneliner"]}</td>\n'
-        f'    </tr>'
-        for item in items
-    )
+        return
 
-    table = f"""
-<table>
+    out.write("\n\n## Definitions\n\n")
+    out.write("""<table>
   <thead>
     <tr>
       <th width="20px"></th>
@@ -167,136 +265,494 @@ def render_category(category: dict) -> str:
     </tr>
   </thead>
   <tbody>
-{rows}
-  </tbody>
-</table>
-""".strip()
-    return f"{details}\n\n## Definitions\n\n{table}\n"
-
-def render_symbols(symbols: dict) -> str:
-    result = render_generic(symbols.get('details', ''))
-    result += "\n\n"
-    result += "| Symbol | Name | Math Class |\n"
-    result += "| ----- | ----- | ----- |\n"
-    for symbol in symbols["list"]:
-        value = symbol["value"]
-        if value in ["|", "`", "'", '"', "\\", "{", "}", "<", ">"]:
-            value = f"\\{value}"
-        result += f"| {value} | {symbol['name']} | {symbol['mathClass']} |\n"
-    return result
-
-def render_group(group: dict) -> str:
-    result = render_generic(group.get("details", "")) + "\n\n"
-    for func in group.get("functions", []):
-        result += render_func(func)
-    return result
-
-def render_type(type_data: dict) -> str:
-    result = render_generic(type_data.get("details", "")) + "\n\n"
-    
-    if type_data.get("constructor"):
-        result += "## Constructor\n"
-        result += render_func(type_data["constructor"], heading_level=3)
-        
-    if type_data.get("scope"):
-        result += "\n## Methods\n"
-        for method in type_data["scope"]:
-            result += render_func(method, heading_level=3)
-            
-    return result
-
-def render_body(body_type: str, body_content) -> str:
-    if body_type == "html":
-        return render_generic(body_content)
-    elif body_type == "category":
-        return render_category(body_content)
-    elif body_type == "symbols":
-        return render_symbols(body_content)
-    elif body_type == "func":
-        return render_func(body_content)
-    elif body_type == "group":
-        return render_group(body_content)
-    elif body_type == "type":
-        return render_type(body_content)
+""")
+    for index, item in enumerate(items):
+        if index:
+            out.write("\n")
+        out.write(
+            f'    <tr>\n'
+            f'      <td width="20px" align="center">—</td>\n'
+            f'      <td><code><a href="{item.route}">{item.name}</a></code></td>\n'
+            f'      <td>{item.oneliner}</td>\n'
+            f'    </tr>'
+        )
+    out.write("\n  </tbody>\n</table>\n")
+
+def write_symbols(out: MdxWriter, symbols: Symbols) -> None:
+    write_generic(out, symbols.details)
+    out.write("\n\n", "| Symbol | Name | Math Class |\n", "| ----- | ----- | ----- |\n")
+    for symbol in symbols.symbols:
+        out.write(f"| {table_cell(symbol.value)} | {table_cell(symbol.name)} | {table_cell(symbol.math_class)} |\n")
+
+def write_group(out: MdxWriter, group: Group) -> None:
+    write_generic(out, group.details)
+    out.write("\n\n")
+    for func in group.functions:
+        write_func(out, func)
+
+def write_type(out: MdxWriter, type_data: Type) -> None:
+    write_generic(out, type_data.details)
+    out.write("\n\n")
+
+    if type_data.constructor:
+        out.write("## Constructor\n")
+        write_func(out, type_data.constructor, heading_level=3)
+
+    if type_data.scope:
+        out.write("\n## Methods\n")
+        for method in type_data.scope:
+            write_func(out, method, heading_level=3)
+
+def write_index(out: MdxWriter, index: Index) -> None:
+    if index.lead:
+        write_body(out, index.lead)
     else:
-        logger.warning(f"Skipping unsupported body type: {body_type}")
-        return ""
-
-def convert_page_to_mdx(page: dict) -> str:
-    title = page.get("title", "Untitled")
-    description = (page.get("description") or "").replace('"', '\\"')
-    
-    body = page.get("body")
-    body_content_str = ""
-
-    imports_dict = {
-        "<TypeTable": "import { TypeTable } from 'fumadocs-ui/components/type-table';",
-        "<TypstPreview": "import { TypstPreview } from '@/components/typst/preview';"
-    }
-    if body:
-        body_type = body.get("kind")
-        body_data = body.get("content")
-        body_content_str = render_body(body_type, body_data)
-
-    imports = ""
-    for import_name in imports_dict.keys():
-        if import_name in body_content_str:
-            imports += imports_dict[import_name] + "\n"
-    if imports:
-        imports = "\n" + imports
-
-    content = f"""---
-title: "{title}"
-description: "{description}"
----\n{imports}
-{body_content_str}
-"""
-    return content
+        write_generic(out, index.details)
+        out.write("\n\n")
+
+    out.write(f"## {index.heading}\n\n")
+    for entry in index.entries:
+        # Keeps links to the former in-page anchors working, they now land next to the link to the sub-page.
+        anchor = f'<a id="{entry.anchor}"></a>' if entry.anchor else ""
+        out.write(f"- {anchor}[{entry.name}](/docs/{index.route}/{entry.slug}/)")
+        if entry.oneliner:
+            out.write(": ")
+            out.html(entry.oneliner)
+        out.write("\n")
+
+BODY_WRITERS = {
+    "html": write_generic,
+    "category": write_category,
+    "symbols": write_symbols,
+    "func": write_func,
+    "group": write_group,
+    "type": write_type,
+    "index": write_index,
+}
+
+def write_body(out: MdxWriter, body: Body) -> None:
+    BODY_WRITERS[body.kind](out, body.content)
 
+def write_page(out: MdxWriter, page: Page) -> str:
+    title = quoted_string(page.title)
+    description = quoted_string(page.description or "")
 
-def generate_meta_json(directory_json: dict, folder_path: Path) -> None:
-    file_path = folder_path / "meta.json"
-    title = directory_json.get("title")
-    description = (directory_json.get("description") or "").replace('\n', ' ')
-    pages = [f'"{elem}"' for elem in directory_json.get("children_order") or []]
+    if page.body:
+        write_body(out, page.body)
+    return out.page(title, description)
+
+def convert_page_to_mdx(page: Page, rewrite: Callable[[str], str] | None = None) -> str:
+    return write_page(MdxWriter(rewrite), page)
+
+
+def render_meta_json(directory_json: Page, root: bool = False) -> str:
+    title = quoted_string(directory_json.title)
+    description = quoted_string(directory_json.description or "")
+    pages = [f'"{elem}"' for elem in directory_json.children_order]
     children_order = ', '.join(pages)
-    meta = f"""{{
+    root_entry = '\n  "root": true,' if root else ""
+    return f"""{{
   "title": "{title}",
-  "description": "{description}",
+  "description": "{description}",{root_entry}
   "pages": [{children_order}]
 }}
 """
-    file_path.write_text(meta, encoding='utf-8')
 
-def generate_mdx_docs(input_json: Path, output_path: Path) -> None:
+def rewrite_asset_urls(content: str, assets: dict[str, str]) -> str:
+    return ASSET_URL.sub(lambda match: f"/assets/{assets.get(match[1], match[1])}", content)
+
+def source_images(assets: dict[str, str] | None, images: dict[str, dict] | None) -> dict[str, dict]:
+    # Metadata is collected from the optimized files, pages reference the original names.
+    if not images or not assets:
+        return images or {}
+    return {name: images[target] for name, target in assets.items() if target in images}
+
+def references(value, context: dict) -> dict[str, dict]:
+    # Asset names, image metadata and moved anchors only affect the pages that reference them.
+    assets, images, links = context.get("assets"), context.get("images"), context.get("links")
+    if not assets and not images and not links:
+        return {}
+    text = json.dumps(value, ensure_ascii=False, default=json_default)
+    found = {}
+    names = sorted(set(ASSET_REFERENCE.findall(text))) if assets or images else []
+    media = {name: [assets.get(name), images.get(name)] for name in names if name in assets or name in images}
+    if media:
+        found["media"] = media
+    keys = (html_converter.link_key(path, anchor) for path, anchor in ANCHOR_REFERENCE.findall(text)) if links else ()
+    moved = {key: links[key] for key in keys if key in links}
+    if moved:
+        found["links"] = moved
+    return found
+
+def anchor_routes(page: Page) -> set[str]:
+    text = json.dumps(page, ensure_ascii=False, default=json_default)
+    return {path.strip("/") for path, _ in ANCHOR_REFERENCE.findall(text)} if "#" in text else set()
+
+def rebase_urls(content: str, version: str) -> str:
+    for prefix in ("](", 'href="', "href='", 'src="', "image='"):
+        content = content.replace(f"{prefix}/docs/", f"{prefix}/docs/{version}/")
+        content = content.replace(f"{prefix}/assets/", f"{prefix}/assets/{version}/")
+    return content
+
+def make_rewrite(context: dict) -> Callable[[str], str] | None:
+    steps = []
+    if context.get("assets"):
+        steps.append(lambda text: rewrite_asset_urls(text, context["assets"]))
+    if context.get("version"):
+        steps.append(lambda text: rebase_urls(text, context["version"]))
+    if not steps:
+        return None
+
+    def rewrite(text: str) -> str:
+        for step in steps:
+            text = step(text)
+        return text
+    return rewrite
+
+def relative_import(path: str, from_file: str) -> str:
+    relative = posixpath.relpath(path, posixpath.dirname(from_file) or ".")
+    return relative if relative.startswith("../") else f"./{relative}"
+
+def render_page_files(page: Page, context: dict | None = None) -> dict[str, str]:
+    context = context or {}
+    version = context.get("version")
+    route = page.route
+    files = {}
+    if not route:
+        files["meta.json"] = render_meta_json(page, root=bool(version))
+        mdx_file = "index.mdx"
+    elif page.has_children:
+        files[f"{route}/meta.json"] = render_meta_json(page)
+        mdx_file = f"{route}/index.mdx"
+    else:
+        mdx_file = f"{route}.mdx"
+
+    sidecar_file = mdx_file.removesuffix(".mdx") + SIDECAR_SUFFIX
+    out = MdxWriter(
+        make_rewrite(context),
+        sidecar=sidecar_file.rsplit("/", 1)[-1] if context.get("type_tables") == "sidecar" else None,
+        partials=context.get("partials", frozenset()),
+        partials_dir=relative_import(PARTIALS_DIR, mdx_file),
+        images=context.get("images"),
+        links=context.get("links"),
+    )
+    files[mdx_file] = write_page(out, page)
+    if out.tables:
+        files[sidecar_file] = out.sidecar_json()
+    return files
+
+def render_partial_files(key: str, partial: Partial, context: dict | None = None) -> dict[str, str]:
+    context = context or {}
+    kind, details = partial
+    out = MdxWriter(make_rewrite(context), images=context.get("images"), links=context.get("links"))
+    if kind == DESCRIPTION:
+        text = param_description(out, details)
+        return {f"{PARTIALS_DIR}/{key}.json": json.dumps(out.rewrite(text) if out.rewrite else text, ensure_ascii=False) + "\n"}
+    write_generic(out, details)
+    return {f"{PARTIALS_DIR}/{key}.mdx": out.partial()}
+
+def init_worker(options: dict, cache_path: Path | None, entries: dict[str, list] | None = None) -> None:
+    html_converter.configure(options)
+    if cache_path and not html_converter.FRAGMENT_CACHE.entries:
+        html_converter.FRAGMENT_CACHE.load(cache_path)
+    if entries:
+        html_converter.FRAGMENT_CACHE.update(entries)
+
+def render_page(page: Page, context: dict | None = None) -> tuple[dict[str, str], dict]:
+    parses = html_converter.STATS["parses"]
+    start = time.perf_counter()
+    files = render_page_files(page, context)
+    return files, {"seconds": time.perf_counter() - start, "parses": html_converter.STATS["parses"] - parses}
+
+def render_page_chunk(pages: list[Page], context: dict | None = None) -> tuple[list[tuple[dict[str, str], dict]], dict]:
+    results = [render_page(page, context) for page in pages]
+    return results, html_converter.FRAGMENT_CACHE.export_delta()
+
+def chunk_pages(pages: list[Page], jobs: int) -> list[list[int]]:
+    costs = [page_cost(page) for page in pages]
+    target = sum(costs) / (jobs * 4)
+    chunks = []
+    current, current_cost = [], 0
+    for index in sorted(range(len(pages)), key=lambda i: costs[i], reverse=True):
+        if costs[index] >= target:
+            chunks.append([index])
+            continue
+        current.append(index)
+        current_cost += costs[index]
+        if current_cost >= target:
+            chunks.append(current)
+            current, current_cost = [], 0
+    if current:
+        chunks.append(current)
+    return chunks
+
+def submit_window(executor: ProcessPoolExecutor, batch: list[tuple], jobs: int, context: dict | None = None) -> list[tuple[Future, int]]:
+    pages = [item[-1] for item in batch]
+    chunks = chunk_pages(pages, jobs)
+    logger.info(f"Rendering {len(pages)} pages in {len(chunks)} chunks with {jobs} workers")
+    futures = [executor.submit(render_page_chunk, [pages[i] for i in chunk], context) for chunk in chunks]
+    location = {index: (future, position) for chunk, future in zip(chunks, futures) for position, index in enumerate(chunk)}
+    return [location[index] for index in range(len(pages))]
+
+def collect_window(batch: list[tuple], locations: list[tuple[Future, int]]) -> Iterator[tuple[tuple, dict[str, str], dict]]:
+    merged = set()
+    for item, (future, position) in zip(batch, locations):
+        results, cache_delta = future.result()
+        if future not in merged:
+            html_converter.FRAGMENT_CACHE.merge_delta(cache_delta)
+            merged.add(future)
+        logger.info(f"Processing: {item[-1].title}")
+        yield item, *results[position]
+
+def render_pages(
+    items: Iterable[tuple],
+    jobs: int = 1,
+    cache_path: Path | None = None,
+    window: int | None = None,
+    context: dict | None = None,
+) -> Iterator[tuple[tuple, dict[str, str], dict]]:
+    jobs = jobs or os.cpu_count() or 1
+    if jobs <= 1:
+        for item in items:
+            logger.info(f"Processing: {item[-1].title}")
+            yield item, *render_page(item[-1], context)
+        return
+
+    batches = batched(items, window) if window else [tuple(items)]
+    options = dict(html_converter.OPTIONS)
+    with ProcessPoolExecutor(max_workers=jobs, initializer=init_worker, initargs=(options, cache_path)) as executor:
+        previous = None
+        for batch in batches:
+            if not batch:
+                continue
+            current = (batch, submit_window(executor, list(batch), jobs, context))
+            if previous:
+                yield from collect_window(*previous)
+            previous = current
+        if previous:
+            yield from collect_window(*previous)
+
+def load_pages(input_json: Path, routes: RouteFilter | None = None) -> list[Page]:
     json_data = json.loads(input_json.read_text(encoding='utf-8'))
 
     full_pages_list = []
     for item in json_data:
-        get_pages_recursive(item, full_pages_list)
+        get_pages_recursive(item, full_pages_list, routes=routes)
     logger.info(f"Found {len(full_pages_list)} pages")
 
     for page in full_pages_list:
-        logger.info(f"Processing: {page['title']}")
-        mdx_content = convert_page_to_mdx(page)
-
-        
-        route = page["route"]
-        if not route:
-            root_data = {
-                "title": json_data[0]["title"],
-                "description": json_data[0]["description"],
-                "children_order": [elem.get("route").split("/")[-2] for elem in json_data[1:]]
-            }
-            generate_meta_json(root_data, output_path)
-            file_path = output_path / "index.mdx"
-        elif page["has_children"]:
-            folder = output_path / route
-            folder.mkdir(parents=True, exist_ok=True)
-            file_path = folder / "index.mdx"
-            generate_meta_json(page, folder)
-        else:
-            folder = output_path / route
-            folder.parent.mkdir(parents=True, exist_ok=True)
-            file_path = Path(str(folder) + ".mdx")
-        file_path.write_text(mdx_content, encoding='utf-8')
+        if not page.route:
+            normalize_root(page, [elem.get("route") for elem in json_data[1:]])
+    return full_pages_list
+
+def compare_parser_backends(input_json: Path, parser: str) -> list[str]:
+    full_pages_list = load_pages(input_json)
+    options = dict(html_converter.OPTIONS)
+    mismatches = []
+    try:
+        for page in full_pages_list:
+            html_converter.configure({"parser": "html.parser"})
+            expected = render_page_files(page)
+            html_converter.configure({"parser": parser})
+            if render_page_files(page) != expected:
+                logger.warning(f"Output of {page.route or '/'} differs with {parser}")
+                mismatches.append(page.route or "/")
+    finally:
+        html_converter.configure(options)
+    logger.info(f"{len(full_pages_list) - len(mismatches)} of {len(full_pages_list)} pages identical with {parser}")
+    return mismatches
+
+def manifest_fingerprint(version: str | None, type_tables: str) -> str:
+    return hash_json([CONVERTER_FINGERPRINT, html_converter.converter_version(), {"version": version, "type_tables": type_tables}])
+
+def page_fragments(page: Page) -> list[str]:
+    recorder = FragmentRecorder()
+    write_page(recorder, page)
+    return recorder.fragments
+
+def convert_fragment_chunk(fragments: tuple[tuple[str, dict, dict], ...]) -> dict:
+    for html, images, links in fragments:
+        html_converter.convert_fragment(html, images, links)
+    return html_converter.FRAGMENT_CACHE.export_delta()
+
+def convert_shared_fragments(
+    builds: list[dict],
+    jobs: int = 1,
+    streaming: bool = False,
+    page_budget: int | None = PAGE_BUDGET,
+    type_tables: str = "inline",
+    routes: RouteFilter | None = None,
+) -> dict[str, list]:
+    # Versions render in parallel processes, each would convert the fragments they have in common on its own.
+    counts: dict[str, int] = {}
+    fragments: dict[str, tuple[str, dict, dict]] = {}
+    for build in builds:
+        manifest = BuildManifest(build["manifest_path"], manifest_fingerprint(build["version"], type_tables))
+        images = source_images(build["assets"], build["images"])
+        links, found = {}, set()
+        for page in stream_pages(build["input_json"], routes) if streaming else load_pages(build["input_json"], routes):
+            links.update(moved_anchors(split_page(page, page_budget)))
+            # Unchanged pages are not rendered again, their fragments are not needed.
+            if not manifest.is_fresh(page.route or "/", hash_json(page), build["output_path"]):
+                found.update(page_fragments(page))
+        keys = {}
+        for html in found:
+            if html:
+                key, used_images, used_links = html_converter.fragment_key(html, images, links)
+                keys[key] = (html, used_images, used_links)
+        for key, fragment in keys.items():
+            counts[key] = counts.get(key, 0) + 1
+            fragments.setdefault(key, fragment)
+
+    fragment_cache = html_converter.FRAGMENT_CACHE
+    shared = [key for key, count in counts.items() if count > 1 and key not in fragment_cache.entries]
+    jobs = jobs or os.cpu_count() or 1
+    if jobs <= 1 or len(shared) <= jobs:
+        for key in shared:
+            html_converter.convert_fragment(*fragments[key])
+    else:
+        options = dict(html_converter.OPTIONS)
+        with ProcessPoolExecutor(max_workers=jobs, initializer=init_worker, initargs=(options, None)) as executor:
+            for cache_delta in executor.map(convert_fragment_chunk, batched([fragments[key] for key in shared], -(-len(shared) // (jobs * 4)))):
+                fragment_cache.merge_delta(cache_delta)
+    logger.info(f"Converted {len(shared)} fragments shared between {len(builds)} versions")
+    return {key: fragment_cache.entries[key] for key in shared if key in fragment_cache.entries}
+
+def generate_mdx_docs(
+    input_json: Path,
+    output_path: Path,
+    manifest_path: Path | None = None,
+    jobs: int = 1,
+    cache_path: Path | None = None,
+    streaming: bool = False,
+    version: str | None = None,
+    assets: dict[str, str] | None = None,
+    images: dict[str, dict] | None = None,
+    search_path: Path | None = None,
+    pages: list[Page] | None = None,
+    page_budget: int | None = PAGE_BUDGET,
+    type_tables: str = "inline",
+    routes: RouteFilter | None = None,
+    shared_partials: bool = False,
+) -> None:
+    context = {"version": version, "type_tables": type_tables}
+    manifest = BuildManifest(manifest_path, manifest_fingerprint(version, type_tables))
+    # Asset names, image metadata and moved anchors only affect the pages that reference them, see references.
+    context.update(assets=assets or {}, images=source_images(assets, images))
+    fragment_cache = html_converter.FRAGMENT_CACHE
+    if cache_path:
+        fragment_cache.load(cache_path)
+    # The counters are process-wide, a run only reports what it added to them.
+    hits, misses = fragment_cache.hits, fragment_cache.misses
+    search_index = SearchIndex(search_path, version, manifest_path.with_name(SEARCH_STATE_FILE) if manifest_path else None)
+
+    # Streaming input is read a second time to find the shared blocks, anything else is only loaded once.
+    loaded = pages if pages is not None or streaming else load_pages(input_json, routes)
+    def source_pages() -> Iterable[Page]:
+        return loaded if loaded is not None else stream_pages(input_json, routes)
+
+    # Shared blocks are only known once every page was seen.
+    links: dict[str, str] = {}
+    def scan_pages() -> Iterator[Page]:
+        for page in source_pages():
+            parts = split_page(page, page_budget)
+            links.update(moved_anchors(parts))
+            yield from parts
+
+    partials = {}
+    # Sidecar tables keep descriptions out of the MDX already, only inline tables import shared ones.
+    descriptions = type_tables == "inline"
+    if shared_partials:
+        partials = collect_partials(scan_pages(), descriptions)
+        logger.info(f"Found {len(partials)} blocks shared between pages")
+    context["links"] = links
+    render_context = {**context, "partials": frozenset(partials)}
+
+    total = 0
+    def pending_parts(page: Page, input_hash: str) -> Iterator[tuple[str, str, Page]]:
+        nonlocal total
+        key = page.route or "/"
+        for part in split_page(page, page_budget):
+            total += 1
+            if part is not page:
+                key, input_hash = part.route, hash_json(part)
+            # The partials a page imports are part of its input, the page inlines any block that stops being shared.
+            used = page_partials(part, partials, descriptions) if partials else []
+            referenced = references(part, context)
+            if used or referenced:
+                input_hash = hash_json([input_hash, used, referenced])
+            if manifest.is_fresh(key, input_hash, output_path):
+                manifest.keep(key)
+            else:
+                yield key, input_hash, part
+
+    def pending_pages() -> Iterator[tuple[str, str, Page]]:
+        if pages is None:
+            METRICS.add_bytes(read=input_json.stat().st_size)
+        # Whether a page is split is known once it was read. Pages linking to anchors of pages that come later are held
+        # back until the end, the rest are rendered right away.
+        seen, deferred = set(), []
+        for page in source_pages():
+            input_hash = hash_json(page)
+            search_index.add(page.route or "/", input_hash, page)
+            seen.add(page.route)
+            links.update(moved_anchors(split_page(page, page_budget)))
+            if page_budget and not shared_partials and not anchor_routes(page) <= seen:
+                deferred.append((page, input_hash))
+                continue
+            yield from pending_parts(page, input_hash)
+        for page, input_hash in deferred:
+            yield from pending_parts(page, input_hash)
+
+    rendered = parses = 0
+    window = (jobs or os.cpu_count() or 1) * 8 if streaming else None
+    page_stats = []
+    with StagedWriter(output_path) as writer:
+        for key, (kind, details) in partials.items():
+            # Partials depend on their own content, which the key is a hash of, and what they reference.
+            partial = f"{PARTIALS_DIR}/{key}"
+            referenced = references(details, context)
+            input_hash = hash_json([key, referenced]) if referenced else key
+            if manifest.is_fresh(partial, input_hash, output_path):
+                manifest.keep(partial)
+            else:
+                files = render_partial_files(key, (kind, details), context)
+                writer.write(partial, files)
+                manifest.update(partial, input_hash, files)
+
+        for (key, input_hash, page), files, stats in render_pages(pending_pages(), jobs, cache_path, window, render_context):
+            rendered += 1
+            parses += stats["parses"]
+            writer.write(key, files)
+            manifest.update(key, input_hash, files)
+            page_stats.append((key, page.kind, stats))
+
+        if routes:
+            # Pages outside the selection were not visited, keep their files and search entries.
+            for key in manifest.previous.keys() - manifest.pages.keys():
+                # Partials may be imported by unvisited pages, a full build removes the unused ones.
+                if not routes.selects("" if key == "/" else key) or key.startswith(f"{PARTIALS_DIR}/"):
+                    manifest.keep(key)
+                    search_index.keep(key)
+        removed = writer.remove_stale(manifest)
+        writer.flush()
+    written = writer.files_written
+    for key, kind, stats in page_stats:
+        page_bytes = writer.page_bytes.get(key, 0)
+        METRICS.add_bytes(written=page_bytes)
+        METRICS.record_page(key, kind, stats["seconds"], stats["parses"], page_bytes)
+    manifest.save()
+    search_index.save()
+    if cache_path:
+        fragment_cache.save(cache_path)
+    METRICS.count("pages_rendered", rendered)
+    METRICS.count("pages_skipped", total - rendered)
+    METRICS.count("files_written", written)
+    METRICS.count("files_removed", removed)
+    METRICS.count("html_parses", parses)
+    METRICS.count("shared_partials", len(partials))
+    hits, misses = fragment_cache.hits - hits, fragment_cache.misses - misses
+    METRICS.count("fragment_cache_hits", hits)
+    METRICS.count("fragment_cache_misses", misses)
+    logger.success(f"Rendered {rendered} pages, skipped {total - rendered} unchanged, wrote {written} files, removed {removed} stale files, "
+                   f"fragment cache {hits} hits / {misses} misses")
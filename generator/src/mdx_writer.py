@@ -0,0 +1,122 @@
+import json
+from typing import Callable, Iterable
+from src.html_to_mdx import convert_fragment
+from src.partials import BLOCK, DESCRIPTION, PARTIAL_COMPONENT, PARTIAL_SUFFIXES
+
+COMPONENT_IMPORTS = {
+    "TypeTable": "import { TypeTable } from 'fumadocs-ui/components/type-table';",
+    "TypstPreview": "import { TypstPreview } from '@/components/typst/preview';",
+    "TypstCode": "import { TypstCode } from '@/components/typst/code';",
+}
+SIDECAR_NAME = "typeTables"
+
+
+class MdxWriter:
+    def __init__(
+        self,
+        rewrite: Callable[[str], str] | None = None,
+        components: set[str] | None = None,
+        sidecar: str | None = None,
+        partials: frozenset[str] = frozenset(),
+        partials_dir: str = "",
+        images: dict[str, dict] | None = None,
+        links: dict[str, str] | None = None,
+    ):
+        self.parts: list[str] = []
+        self.rewrite = rewrite
+        self.components = set() if components is None else components
+        # With a sidecar, TypeTable data is collected here and emitted as JSON next to the page.
+        self.sidecar = sidecar
+        self.tables: dict[str, dict] = {}
+        # Shared blocks available as partials, imported from partials_dir relative to the page.
+        self.partials = partials
+        self.partials_dir = partials_dir
+        self.included: dict[str, str] = {}
+        # Image metadata by asset name and sub-pages of moved anchors, both applied while fragments are converted.
+        self.images = images
+        self.links = links
+
+    def write(self, *parts: str) -> None:
+        if self.rewrite:
+            self.parts.extend(self.rewrite(part) for part in parts)
+        else:
+            self.parts.extend(parts)
+
+    def html(self, html: str) -> None:
+        text, components = convert_fragment(html, self.images, self.links)
+        self.components.update(components)
+        self.write(text)
+
+    def use(self, component: str) -> None:
+        self.components.add(component)
+
+    def include(self, key: str) -> bool:
+        if key not in self.partials:
+            return False
+        self.included[key] = PARTIAL_SUFFIXES[BLOCK]
+        # Components are not inherited by imported MDX, pass the page's own on.
+        self.write(f"<{PARTIAL_COMPONENT}{key} components={{props.components}} />")
+        return True
+
+    def shared_value(self, key: str) -> str | None:
+        # Shared strings are imported from JSON modules and referenced by name inside JS expressions.
+        if key not in self.partials:
+            return None
+        self.included[key] = PARTIAL_SUFFIXES[DESCRIPTION]
+        return f"{PARTIAL_COMPONENT}{key}"
+
+    def table(self, key: str, rows: dict[str, dict]) -> str:
+        unique, suffix = key, 1
+        while unique in self.tables:
+            suffix += 1
+            unique = f"{key}-{suffix}"
+        if self.rewrite:
+            rows = {name: {field: self.rewrite(value) for field, value in row.items()} for name, row in rows.items()}
+        self.tables[unique] = rows
+        return unique
+
+    def sidecar_json(self) -> str:
+        return json.dumps(self.tables, ensure_ascii=False, separators=(",", ":")) + "\n"
+
+    def fork(self) -> "MdxWriter":
+        # Captures a nested block as a string while still recording the components it uses,
+        # the rewrite applies once the captured text is written to this writer.
+        return MdxWriter(components=self.components, images=self.images, links=self.links)
+
+    def getvalue(self) -> str:
+        return "".join(self.parts)
+
+    def imports(self) -> Iterable[str]:
+        yield from (line for component, line in COMPONENT_IMPORTS.items() if component in self.components)
+        if self.tables:
+            yield f"import {SIDECAR_NAME} from './{self.sidecar}';"
+        for key, suffix in self.included.items():
+            yield f"import {PARTIAL_COMPONENT}{key} from '{self.partials_dir}/{key}{suffix}';"
+
+    def page(self, title: str, description: str) -> str:
+        imports = "".join(f"{line}\n" for line in self.imports())
+        header = f'---\ntitle: "{title}"\ndescription: "{description}"\n---\n'
+        if imports:
+            header += f"\n{imports}"
+        if self.rewrite:
+            header = self.rewrite(header)
+        return "".join([header, "\n", *self.parts, "\n"])
+
+    def partial(self) -> str:
+        imports = "".join(f"{line}\n" for line in self.imports())
+        if imports and self.rewrite:
+            imports = self.rewrite(imports)
+        return "".join([imports, "\n" if imports else "", *self.parts, "\n"])
+
+
+class FragmentRecorder(MdxWriter):
+    # Walks a page the way rendering does, collecting the HTML fragments instead of converting them.
+    def __init__(self, fragments: list[str] | None = None):
+        super().__init__()
+        self.fragments = [] if fragments is None else fragments
+
+    def html(self, html: str) -> None:
+        self.fragments.append(html)
+
+    def fork(self) -> "FragmentRecorder":
+        return FragmentRecorder(self.fragments)
@@ -0,0 +1,113 @@
+import json
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator
+from loguru import logger
+
+
+class Metrics:
+    def __init__(self):
+        self.started_at = time.time()
+        self.stages: dict[str, dict] = {}
+        self.pages: list[dict] = []
+        self.counters: dict[str, int] = defaultdict(int)
+        self.lock = threading.Lock()
+        self.local = threading.local()
+
+    @property
+    def current_stage(self) -> str | None:
+        return getattr(self.local, "stage", None)
+
+    @current_stage.setter
+    def current_stage(self, name: str | None) -> None:
+        self.local.stage = name
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[dict]:
+        record = self.stages.setdefault(name, {"seconds": 0.0, "bytes_read": 0, "bytes_written": 0})
+        outer, self.current_stage = self.current_stage, name
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record["seconds"] += time.perf_counter() - start
+            self.current_stage = outer
+            logger.debug(f"Stage {name} took {record['seconds']:.3f}s")
+
+    def add_bytes(self, read: int = 0, written: int = 0) -> None:
+        if self.current_stage is None:
+            return
+        with self.lock:
+            record = self.stages[self.current_stage]
+            record["bytes_read"] += read
+            record["bytes_written"] += written
+
+    def count(self, name: str, value: int = 1) -> None:
+        with self.lock:
+            self.counters[name] += value
+
+    def record_page(self, route: str, kind: str, seconds: float, parses: int, bytes_written: int) -> None:
+        with self.lock:
+            self.pages.append({
+                "route": route,
+                "kind": kind,
+                "seconds": seconds,
+                "parses": parses,
+                "bytes_written": bytes_written,
+            })
+
+    def reset(self) -> None:
+        self.__init__()
+
+    def merge(self, data: dict) -> None:
+        # Folds in the to_dict() of metrics recorded in another process.
+        with self.lock:
+            for name, record in data["stages"].items():
+                stage = self.stages.setdefault(name, {"seconds": 0.0, "bytes_read": 0, "bytes_written": 0})
+                for field, value in record.items():
+                    stage[field] += value
+            for name, value in data["counters"].items():
+                self.counters[name] += value
+            self.pages.extend(data["pages"])
+
+    def to_dict(self) -> dict:
+        return {
+            "started_at": self.started_at,
+            "stages": self.stages,
+            "counters": dict(self.counters),
+            "pages": self.pages,
+        }
+
+    def to_openmetrics(self) -> str:
+        lines = []
+        for metric, field, help_text in [
+            ("generator_stage_duration_seconds", "seconds", "Wall time spent in a pipeline stage"),
+            ("generator_stage_read_bytes", "bytes_read", "Bytes read by a pipeline stage"),
+            ("generator_stage_written_bytes", "bytes_written", "Bytes written by a pipeline stage"),
+        ]:
+            lines.append(f"# TYPE {metric} gauge")
+            lines.append(f"# HELP {metric} {help_text}.")
+            for stage, record in self.stages.items():
+                lines.append(f'{metric}{{stage="{stage}"}} {record[field]}')
+        for counter, value in sorted(self.counters.items()):
+            lines.append(f"# TYPE generator_{counter} gauge")
+            lines.append(f"generator_{counter} {value}")
+        lines.append("# TYPE generator_pages gauge")
+        lines.append(f"generator_pages {len(self.pages)}")
+        lines.append("# TYPE generator_page_duration_seconds_max gauge")
+        lines.append(f"generator_page_duration_seconds_max {max((page['seconds'] for page in self.pages), default=0)}")
+        lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+    def write_report(self, json_path: Path, openmetrics_path: Path | None = None) -> None:
+        json_path.parent.mkdir(parents=True, exist_ok=True)
+        json_path.write_text(json.dumps(self.to_dict(), indent=2) + "\n", encoding="utf-8")
+        if openmetrics_path:
+            openmetrics_path.write_text(self.to_openmetrics(), encoding="utf-8")
+        logger.info(f"Metrics written to {json_path}")
+
+
+METRICS = Metrics()
@@ -0,0 +1,123 @@
+import os
+import queue
+import shutil
+import threading
+from pathlib import Path
+from src.manifest import BuildManifest, remove_stale_files
+from src.sync import list_files, swap_directories
+
+WRITER_THREADS = 4
+QUEUE_SIZE = 64
+
+
+class StagedWriter:
+    # Rendered files are written by background threads into a staging copy of output_path, which replaces
+    # output_path in a single rename once the run succeeds. A killed or failed run leaves the old tree untouched.
+    def __init__(self, output_path: Path, threads: int = WRITER_THREADS, queue_size: int = QUEUE_SIZE):
+        self.output_path = output_path
+        self.staging = output_path.with_name(f".{output_path.name}.staging")
+        self.queue: queue.Queue = queue.Queue(queue_size)
+        self.thread_count = threads
+        self.threads: list[threading.Thread] = []
+        self.lock = threading.Lock()
+        self.error: BaseException | None = None
+        self.page_bytes: dict[str, int] = {}
+        self.files_written = 0
+        self.files_removed = 0
+
+    def __enter__(self) -> "StagedWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, traceback) -> None:
+        if exc_type is None:
+            self.commit()
+        else:
+            self.abort()
+
+    def stage(self) -> None:
+        if self.threads:
+            return
+        # Unchanged files are hard links to the current ones, so only changed files cost a write.
+        shutil.rmtree(self.staging, ignore_errors=True)
+        for name, file in list_files(self.output_path).items():
+            staged = self.staging / name
+            staged.parent.mkdir(parents=True, exist_ok=True)
+            os.link(file, staged)
+        self.staging.mkdir(parents=True, exist_ok=True)
+        self.threads = [threading.Thread(target=self.run, daemon=True) for _ in range(self.thread_count)]
+        for thread in self.threads:
+            thread.start()
+
+    def write(self, key: str, files: dict[str, str]) -> None:
+        if self.error:
+            raise self.error
+        self.stage()
+        self.queue.put((key, files))
+
+    def run(self) -> None:
+        while (item := self.queue.get()) is not None:
+            try:
+                if self.error is None:
+                    self.write_files(*item)
+            except BaseException as e:
+                self.error = e
+            finally:
+                self.queue.task_done()
+        self.queue.task_done()
+
+    def write_files(self, key: str, files: dict[str, str]) -> None:
+        written = page_bytes = 0
+        for file, content in files.items():
+            data = content.encode("utf-8")
+            path = self.staging / file
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                path.parent.mkdir(parents=True, exist_ok=True)
+            else:
+                if stat.st_size == len(data) and path.read_bytes() == data:
+                    continue
+                # The staged file may be a hard link into the live tree, which must not change under readers.
+                path.unlink()
+            path.write_bytes(data)
+            written += 1
+            page_bytes += len(data)
+        with self.lock:
+            self.page_bytes[key] = page_bytes
+            self.files_written += written
+
+    def flush(self) -> None:
+        if self.threads:
+            self.queue.join()
+        if self.error:
+            raise self.error
+
+    def remove_stale(self, manifest: BuildManifest) -> int:
+        if not manifest.stale_files():
+            return 0
+        self.stage()
+        self.flush()
+        self.files_removed = remove_stale_files(manifest, self.staging)
+        return self.files_removed
+
+    def stop(self) -> None:
+        for _ in self.threads:
+            self.queue.put(None)
+        for thread in self.threads:
+            thread.join()
+
+    def commit(self) -> None:
+        if not self.threads:
+            return
+        self.flush()
+        self.stop()
+        if self.files_written or self.files_removed:
+            swap_directories(self.staging, self.output_path)
+        else:
+            shutil.rmtree(self.staging)
+
+    def abort(self) -> None:
+        # Workers skip what is left in the queue once an error is set.
+        self.error = self.error or RuntimeError("Output writing aborted")
+        self.stop()
+        shutil.rmtree(self.staging, ignore_errors=True)
@@ -0,0 +1,101 @@
+import json
+import re
+from dataclasses import replace
+from itertools import groupby
+from src.html_tree import parse_fragment
+from src.manifest import json_default
+from src.schema import Body, Index, IndexEntry, Page, Symbols
+
+# Cost of a page is the size of its body in output.json, the same measure used to balance worker chunks.
+PAGE_BUDGET = 120_000
+SPLITTABLE_KINDS = ("type", "symbols")
+
+
+def json_size(value) -> int:
+    return len(json.dumps(value, default=json_default))
+
+
+def page_cost(page: Page) -> int:
+    return json_size(page.body)
+
+
+def slugify(name: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "-", name.lower()).strip("-") or "index"
+
+
+def plain_text(html: str) -> str:
+    text = parse_fragment(html).get_text() if "<" in html else html
+    return " ".join(text.split())
+
+
+def sub_page(page: Page, slug: str, title: str, body: Body, description: str | None) -> Page:
+    return Page(title=title, route=f"{page.route}/{slug}", description=description, part=page.part, body=body, has_children=False)
+
+
+def index_page(page: Page, details: tuple[str, ...], heading: str, entries: list[IndexEntry], lead: Body | None = None) -> Page:
+    return replace(
+        page,
+        body=Body("index", Index(route=page.route, details=details, lead=lead, heading=heading, entries=tuple(entries))),
+        has_children=True,
+        children_order=[entry.slug for entry in entries],
+    )
+
+
+def split_type(page: Page) -> list[Page]:
+    content = page.body.content
+    type_name = content.name or page.title
+    pages, entries = [], []
+    for method in content.scope:
+        slug = slugify(method.name)
+        entries.append(IndexEntry(name=method.name, slug=slug, anchor=f"definitions-{method.name}", oneliner=method.oneliner))
+        pages.append(sub_page(page, slug, f"{type_name}.{method.name}", Body("func", method), plain_text(method.oneliner) or None))
+    lead = Body("type", replace(content, scope=()))
+    return [index_page(page, (), "Methods", entries, lead), *pages]
+
+
+def split_symbols(page: Page, budget: int) -> list[Page]:
+    content = page.body.content
+    blocks, block, block_cost = [], [], 0
+    # Symbols sharing their first name segment (arrow.r, arrow.l, ...) stay on the same sub-page.
+    for _, variants in groupby(content.symbols, key=lambda symbol: symbol.name.split(".")[0]):
+        variants = list(variants)
+        cost = json_size(variants)
+        if block and block_cost + cost > budget:
+            blocks.append(block)
+            block, block_cost = [], 0
+        block.extend(variants)
+        block_cost += cost
+    if block:
+        blocks.append(block)
+
+    pages, entries, slugs = [], [], set()
+    for block in blocks:
+        first, last = block[0].name.split(".")[0], block[-1].name.split(".")[0]
+        slug = slugify(first if first == last else f"{first}-{last}")
+        while slug in slugs:
+            slug += "-1"
+        slugs.add(slug)
+        name = first if first == last else f"{first} – {last}"
+        entries.append(IndexEntry(name=name, slug=slug, anchor=None, oneliner=f"{len(block)} symbols"))
+        pages.append(sub_page(page, slug, f"{page.title}: {name}", Body("symbols", Symbols(details=(), symbols=tuple(block))), page.description))
+    return [index_page(page, content.details, "Symbols", entries), *pages]
+
+
+def split_page(page: Page, budget: int | None = PAGE_BUDGET) -> list[Page]:
+    if not budget or page.kind not in SPLITTABLE_KINDS or not page.route or page.has_children:
+        return [page]
+    if page_cost(page) <= budget:
+        return [page]
+    if page.kind == "type" and page.body.content.scope:
+        return split_type(page)
+    if page.kind == "symbols":
+        return split_symbols(page, budget)
+    return [page]
+
+
+def moved_anchors(parts: list[Page]) -> dict[str, str]:
+    # Definitions that moved to a sub-page, by the route and anchor links to them used before the split.
+    index = parts[0]
+    if len(parts) == 1 or index.kind != "index":
+        return {}
+    return {f"{index.route}#{entry.anchor}": f"{index.route}/{entry.slug}" for entry in index.body.content.entries if entry.anchor}
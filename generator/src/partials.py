@@ -0,0 +1,72 @@
+from collections import Counter
+from typing import Iterable, Iterator
+from src.manifest import hash_json
+from src.schema import Body, Details, Func, Page
+
+PARTIALS_DIR = "_partials"
+PARTIAL_COMPONENT = "Partial"
+# Below this many characters of source HTML an import costs about as much as the inlined block.
+PARTIAL_MIN_SIZE = 400
+PARTIAL_MIN_PAGES = 2
+# Blocks are rendered as MDX partials, parameter descriptions are plain strings in TypeTable props and are
+# shared as JSON modules instead.
+BLOCK = "block"
+DESCRIPTION = "description"
+PARTIAL_SUFFIXES = {BLOCK: ".mdx", DESCRIPTION: ".json"}
+
+Partial = tuple[str, Details]
+
+
+def partial_key(details: Details, kind: str = BLOCK) -> str:
+    return hash_json(details if kind == BLOCK else [kind, details])[:16]
+
+
+def func_blocks(func: Func, descriptions: bool = False) -> Iterator[Partial]:
+    yield BLOCK, func.details
+    yield BLOCK, func.example
+    if descriptions:
+        for param in func.params:
+            yield DESCRIPTION, param.details
+    for scope_func in func.scope:
+        yield from func_blocks(scope_func, descriptions)
+
+
+def body_blocks(body: Body | None, descriptions: bool = False) -> Iterator[Partial]:
+    if body is None:
+        return
+    content = body.content
+    if body.kind == "func":
+        yield from func_blocks(content, descriptions)
+    elif body.kind == "group":
+        for func in content.functions:
+            yield from func_blocks(func, descriptions)
+    elif body.kind == "type":
+        for func in [content.constructor] if content.constructor else []:
+            yield from func_blocks(func, descriptions)
+        for method in content.scope:
+            yield from func_blocks(method, descriptions)
+    elif body.kind == "index":
+        yield from body_blocks(content.lead, descriptions)
+
+
+def page_blocks(page: Page, descriptions: bool = False) -> dict[str, Partial]:
+    return {
+        partial_key(details, kind): (kind, details)
+        for kind, details in body_blocks(page.body, descriptions)
+        if sum(map(len, details)) >= PARTIAL_MIN_SIZE
+    }
+
+
+def collect_partials(pages: Iterable[Page], descriptions: bool = False) -> dict[str, Partial]:
+    # A block becomes a partial once it is rendered on several pages, repeats within one page do not count.
+    counts: Counter[str] = Counter()
+    blocks: dict[str, Partial] = {}
+    for page in pages:
+        found = page_blocks(page, descriptions)
+        counts.update(found.keys())
+        blocks.update(found)
+    return {key: blocks[key] for key, count in sorted(counts.items()) if count >= PARTIAL_MIN_PAGES}
+
+
+def page_partials(page: Page, partials: dict[str, Partial] | frozenset[str], descriptions: bool = False) -> list[str]:
+    return sorted(key for key in page_blocks(page, descriptions) if key in partials)
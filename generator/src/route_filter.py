@@ -0,0 +1,22 @@
+def is_under(route: str, prefix: str) -> bool:
+    return not prefix or route == prefix or route.startswith(f"{prefix}/")
+
+
+class RouteFilter:
+    def __init__(self, only: list[str] | None = None, exclude: list[str] | None = None):
+        self.only = [prefix.strip("/") for prefix in only or []]
+        self.exclude = [prefix.strip("/") for prefix in exclude or []]
+
+    def __bool__(self) -> bool:
+        return bool(self.only or self.exclude)
+
+    def selects(self, route: str) -> bool:
+        if any(is_under(route, prefix) for prefix in self.exclude):
+            return False
+        return not self.only or any(is_under(route, prefix) for prefix in self.only)
+
+    def visits(self, route: str) -> bool:
+        # Parents of an --only prefix are walked to reach it, but are not rendered themselves.
+        if any(is_under(route, prefix) for prefix in self.exclude):
+            return False
+        return not self.only or any(is_under(route, prefix) or is_under(prefix, route) for prefix in self.only)
@@ -0,0 +1,344 @@
+from dataclasses import dataclass, field
+from typing import Callable
+
+# Typed view of output.json, keeping only the fields the converter reads. Pages are decoded once while the
+# tree is walked, and unexpected shapes raise a SchemaError with the page and JSON path.
+
+Details = tuple[str, ...]
+
+
+class SchemaError(ValueError):
+    # The JSON path is filled in while the error propagates, so decoding valid input never formats it.
+    def __init__(self, message: str):
+        super().__init__(message)
+        self.message = message
+        self.path: list[str] = []
+
+    def at(self, segment: str) -> "SchemaError":
+        self.path.insert(0, segment)
+        return self
+
+    def __str__(self) -> str:
+        path = "".join(self.path).lstrip(".")
+        return f"{path}: {self.message}" if path else self.message
+
+
+TYPE_NAMES = {str: "a string", bool: "a boolean", list: "a list", dict: "an object", type(None): "null"}
+MISSING = object()
+
+
+def type_error(value, types: type | tuple[type, ...]) -> SchemaError:
+    types = types if isinstance(types, tuple) else (types,)
+    expected = " or ".join(TYPE_NAMES.get(t, t.__name__) for t in types)
+    return SchemaError(f"expected {expected}, got {TYPE_NAMES.get(type(value), type(value).__name__)}")
+
+
+def expect(value, types: type | tuple[type, ...]):
+    if not isinstance(value, types):
+        raise type_error(value, types)
+    return value
+
+
+def get(data: dict, key: str, types: type | tuple[type, ...], default=MISSING):
+    value = data.get(key)
+    if value is None:
+        if default is MISSING:
+            raise SchemaError(f"missing field '{key}'")
+        return default
+    if not isinstance(value, types):
+        raise type_error(value, types).at(f".{key}")
+    return value
+
+
+def decode_list(data: dict, key: str, decode: Callable) -> tuple:
+    values = get(data, key, list, ())
+    try:
+        return tuple([decode(value) for value in values])
+    except SchemaError as error:
+        # Only the failing path pays for locating the offending item.
+        index = next(index for index, value in enumerate(values) if not decodes(decode, value))
+        raise error.at(f".{key}[{index}]")
+
+
+def decodes(decode: Callable, value) -> bool:
+    try:
+        decode(value)
+    except SchemaError:
+        return False
+    return True
+
+
+def decode_string(value) -> str:
+    return expect(value, str)
+
+
+def strings(data: dict, key: str) -> tuple[str, ...]:
+    values = data.get(key)
+    if type(values) is list and all(type(value) is str for value in values):
+        return tuple(values)
+    return decode_list(data, key, decode_string)
+
+
+def decode_block(block) -> str:
+    if isinstance(block, str):
+        return block
+    kind = get(expect(block, dict), "kind", str, "html")
+    if kind == "html":
+        return get(block, "content", str, "")
+    if kind == "example":
+        body = get(block, "content", dict, {}).get("body")
+        if body is not None and not isinstance(body, str):
+            raise type_error(body, str).at(".content.body")
+        return body or ""
+    raise SchemaError(f"unknown details block '{kind}'").at(".kind")
+
+
+def decode_details(data: dict, key: str = "details") -> Details:
+    # Older typst-docs emit details as one HTML string, newer ones as a list of html and example blocks.
+    value = data.get(key)
+    if not value:
+        return ()
+    if isinstance(value, str):
+        return (value,)
+    return decode_list(data, key, decode_block)
+
+
+def decode_example(data: dict) -> Details:
+    value = data.get("example")
+    if isinstance(value, dict) and "body" in value:
+        body = value["body"]
+        if not isinstance(body, str):
+            raise type_error(body, str).at(".example.body")
+        return (body,)
+    return decode_details(data, "example")
+
+
+def decoder(cls) -> Callable:
+    # Checks that the value is an object before handing it to cls.decode.
+    def decode(data):
+        return cls.decode(expect(data, dict))
+    return decode
+
+
+@dataclass(slots=True)
+class Param:
+    name: str
+    details: Details
+    types: tuple[str, ...]
+    named: bool
+    default: str | None
+
+    @classmethod
+    def decode(cls, data: dict) -> "Param":
+        default = data.get("default")
+        return cls(
+            name=get(data, "name", str),
+            details=decode_details(data),
+            types=strings(data, "types"),
+            named=get(data, "named", bool, False),
+            default=None if default is None else str(default),
+        )
+
+
+@dataclass(slots=True)
+class Func:
+    name: str
+    path: tuple[str, ...]
+    oneliner: str
+    details: Details
+    params: tuple[Param, ...]
+    returns: tuple[str, ...] | None
+    example: Details
+    scope: tuple["Func", ...]
+
+    @property
+    def qualified_name(self) -> str:
+        return ".".join((*self.path, self.name))
+
+    @classmethod
+    def decode(cls, data: dict) -> "Func":
+        return cls(
+            name=get(data, "name", str),
+            path=strings(data, "path"),
+            oneliner=get(data, "oneliner", str, ""),
+            details=decode_details(data),
+            params=decode_list(data, "params", decode_param),
+            returns=strings(data, "returns") if "returns" in data else None,
+            example=decode_example(data),
+            scope=decode_list(data, "scope", decode_func),
+        )
+
+
+decode_param = decoder(Param)
+decode_func = decoder(Func)
+
+
+@dataclass(slots=True)
+class CategoryItem:
+    name: str
+    route: str
+    oneliner: str
+
+    @classmethod
+    def decode(cls, data: dict) -> "CategoryItem":
+        return cls(name=get(data, "name", str), route=get(data, "route", str), oneliner=get(data, "oneliner", str, ""))
+
+
+@dataclass(slots=True)
+class Category:
+    details: Details
+    items: tuple[CategoryItem, ...]
+
+    @classmethod
+    def decode(cls, data: dict) -> "Category":
+        return cls(details=decode_details(data), items=decode_list(data, "items", decoder(CategoryItem)))
+
+
+@dataclass(slots=True)
+class Group:
+    details: Details
+    functions: tuple[Func, ...]
+
+    @classmethod
+    def decode(cls, data: dict) -> "Group":
+        return cls(details=decode_details(data), functions=decode_list(data, "functions", decode_func))
+
+
+@dataclass(slots=True)
+class Type:
+    name: str
+    details: Details
+    constructor: Func | None
+    scope: tuple[Func, ...]
+
+    @classmethod
+    def decode(cls, data: dict) -> "Type":
+        constructor = data.get("constructor")
+        try:
+            constructor = decode_func(constructor) if constructor else None
+        except SchemaError as error:
+            raise error.at(".constructor")
+        return cls(
+            name=get(data, "name", str, ""),
+            details=decode_details(data),
+            constructor=constructor,
+            scope=decode_list(data, "scope", decode_func),
+        )
+
+
+@dataclass(slots=True)
+class Symbol:
+    name: str
+    value: str
+    math_class: str
+
+    @classmethod
+    def decode(cls, data: dict) -> "Symbol":
+        return cls(name=get(data, "name", str), value=get(data, "value", str), math_class=get(data, "mathClass", str))
+
+
+@dataclass(slots=True)
+class Symbols:
+    details: Details
+    symbols: tuple[Symbol, ...]
+
+    @classmethod
+    def decode(cls, data: dict) -> "Symbols":
+        get(data, "list", list)
+        return cls(details=decode_details(data), symbols=decode_list(data, "list", decoder(Symbol)))
+
+
+@dataclass(slots=True)
+class IndexEntry:
+    name: str
+    slug: str
+    anchor: str | None
+    oneliner: str
+
+
+@dataclass(slots=True)
+class Index:
+    # Produced by page_split for the landing page of a split page, never read from output.json.
+    route: str
+    details: Details
+    lead: "Body | None"
+    heading: str
+    entries: tuple[IndexEntry, ...]
+
+
+@dataclass(slots=True)
+class Body:
+    kind: str
+    content: Details | Category | Func | Group | Type | Symbols | Index
+
+
+BODY_DECODERS = {
+    "html": lambda content: (expect(content, str),),
+    "category": decoder(Category),
+    "func": decode_func,
+    "group": decoder(Group),
+    "type": decoder(Type),
+    "symbols": decoder(Symbols),
+}
+
+
+def decode_body(data: dict) -> Body:
+    kind = get(data, "kind", str)
+    body_decoder = BODY_DECODERS.get(kind)
+    if body_decoder is None:
+        raise SchemaError(f"unsupported body kind '{kind}', the converter needs updating for this typst-docs version").at(".kind")
+    try:
+        return Body(kind, body_decoder(data.get("content")))
+    except SchemaError as error:
+        raise error.at(".content")
+
+
+def decode_children(routes: list) -> list[str]:
+    # Children are listed by the last segment of their route, typst-docs ends every route with a slash.
+    order = []
+    for index, route in enumerate(routes):
+        if not isinstance(route, str):
+            raise type_error(route, str).at(f"children[{index}].route")
+        if "/" not in route:
+            raise SchemaError(f"expected a route ending in '/', got '{route}'").at(f"children[{index}].route")
+        order.append(route.split("/")[-2])
+    return order
+
+
+@dataclass(slots=True)
+class Page:
+    title: str
+    route: str
+    description: str | None
+    part: str | None
+    body: Body | None
+    has_children: bool
+    children_order: list[str] = field(default_factory=list)
+
+    @property
+    def kind(self) -> str:
+        return self.body.kind if self.body else "empty"
+
+    @classmethod
+    def decode(cls, data: dict, child_routes: list) -> "Page":
+        route = data.get("route")
+        route = route.strip("/") if isinstance(route, str) else ""
+        try:
+            children_order = decode_children(child_routes)
+            description = get(data, "description", str, None)
+            body = data.get("body")
+            try:
+                body = decode_body(expect(body, dict)) if body is not None else None
+            except SchemaError as error:
+                raise error.at("body")
+            return cls(
+                title=get(data, "title", str),
+                route=route,
+                description=description.replace("\n", " ").strip() if description else description,
+                part=get(data, "part", str, None),
+                body=body,
+                has_children=bool(children_order),
+                children_order=children_order,
+            )
+        except SchemaError as error:
+            raise SchemaError(f"page {route or '/'}: {error}") from None
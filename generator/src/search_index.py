@@ -0,0 +1,215 @@
+import json
+import re
+from collections import defaultdict
+from pathlib import Path
+from loguru import logger
+from src.html_tree import parse_fragment
+from src.manifest import hash_files, write_if_changed
+from src.schema import Func, Page
+
+SEARCH_FINGERPRINT = hash_files(Path(__file__))
+SHARDS_FILE = "manifest.json"
+VERSIONS_FILE = "versions.json"
+# Kept next to the build manifest, never in the published search directory.
+SEARCH_STATE_FILE = "search_state.json"
+# The shard manifest lists the term prefixes of each shard, so the client only fetches shards that can match.
+PREFIX_LENGTH = 2
+# Sections with more pages than this are split by their second route segment, so a query does not fetch most of the
+# reference at once.
+SHARD_MAX_PAGES = 40
+SHARD_SEPARATOR = "+"
+
+WEIGHTS = {
+    "title": 16,
+    "func": 12,
+    "symbol": 8,
+    "param": 6,
+    "description": 3,
+    "math_class": 2,
+    "prose": 1,
+}
+MAX_PROSE_FREQUENCY = 5
+STOP_WORDS = frozenset("a an and are as at be by for from if in into is it of on or that the this to with".split())
+TOKEN = re.compile(r"\w[\w.-]*\w|\w")
+
+
+def tokenize(text: str) -> list[str]:
+    tokens = []
+    for token in TOKEN.findall(text.lower()):
+        if token not in STOP_WORDS:
+            tokens.append(token)
+        if "." in token or "-" in token:
+            tokens.extend(part for part in re.split(r"[.-]", token) if part and part not in STOP_WORDS)
+    return tokens
+
+
+def html_text(html: str) -> str:
+    return parse_fragment(html).get_text(" ") if "<" in html else html
+
+
+def prose_of(content) -> list[str]:
+    if isinstance(content, tuple):
+        return [html_text(block) for block in content]
+    texts = prose_of(getattr(content, "details", ()))
+    if getattr(content, "oneliner", ""):
+        texts.append(html_text(content.oneliner))
+    return texts
+
+
+class PageEntries:
+    def __init__(self, url: str, title: str):
+        self.url = url
+        self.title = title
+        self.docs: list[list] = []
+        self.terms: dict[str, dict[int, int]] = defaultdict(dict)
+
+    def add_doc(self, kind: str, content: str) -> int:
+        self.docs.append([kind, content])
+        return len(self.docs) - 1
+
+    def add_terms(self, doc: int, text: str, weight: int, cap: int | None = None) -> None:
+        counts = defaultdict(int)
+        for token in tokenize(text):
+            counts[token] += 1
+        for token, count in counts.items():
+            score = weight * min(count, cap or count)
+            postings = self.terms[token]
+            postings[doc] = max(postings.get(doc, 0), score)
+
+    def add_func(self, func: Func) -> None:
+        path = func.qualified_name
+        doc = self.add_doc("heading", path)
+        self.add_terms(doc, path, WEIGHTS["func"])
+        for param in func.params:
+            param_doc = self.add_doc("text", f"{path}({param.name})")
+            self.add_terms(param_doc, param.name, WEIGHTS["param"])
+        for scope_func in func.scope:
+            self.add_func(scope_func)
+
+    def to_dict(self) -> dict:
+        return {
+            "url": self.url,
+            "title": self.title,
+            "docs": self.docs,
+            "terms": {term: sorted(postings.items()) for term, postings in self.terms.items()},
+        }
+
+
+def page_url(route: str, version: str | None = None) -> str:
+    return "/".join(part for part in ("/docs", version, route) if part)
+
+
+def extract_entries(page: Page, version: str | None = None) -> dict:
+    entries = PageEntries(page_url(page.route, version), page.title)
+    page_doc = entries.add_doc("page", entries.title)
+    entries.add_terms(page_doc, entries.title, WEIGHTS["title"])
+    entries.add_terms(page_doc, page.description or "", WEIGHTS["description"], MAX_PROSE_FREQUENCY)
+
+    kind, content = page.kind, page.body.content if page.body else None
+    if kind == "func":
+        entries.add_func(content)
+    elif kind == "group":
+        for func in content.functions:
+            entries.add_func(func)
+    elif kind == "type":
+        type_doc = entries.add_doc("heading", content.name or entries.title)
+        entries.add_terms(type_doc, content.name, WEIGHTS["func"])
+        for func in [content.constructor] if content.constructor else []:
+            entries.add_func(func)
+        for method in content.scope:
+            entries.add_func(method)
+    elif kind == "symbols":
+        for symbol in content.symbols:
+            doc = entries.add_doc("text", f"{symbol.value} {symbol.name}")
+            entries.add_terms(doc, symbol.name, WEIGHTS["symbol"])
+            entries.add_terms(doc, symbol.math_class, WEIGHTS["math_class"])
+    if content:
+        entries.add_terms(page_doc, " ".join(prose_of(content)), WEIGHTS["prose"], MAX_PROSE_FREQUENCY)
+    return entries.to_dict()
+
+
+def section_of(key: str, depth: int = 1) -> str:
+    return SHARD_SEPARATOR.join(key.split("/")[:depth]) if key not in ("", "/") else "index"
+
+
+def shard_sections(keys: list[str]) -> dict[str, list[str]]:
+    sections = defaultdict(list)
+    for key in keys:
+        sections[section_of(key)].append(key)
+    shards = defaultdict(list)
+    for section, section_keys in sections.items():
+        for key in section_keys:
+            shards[section_of(key, 2) if len(section_keys) > SHARD_MAX_PAGES else section].append(key)
+    return shards
+
+
+class SearchIndex:
+    def __init__(self, path: Path | None, version: str | None = None, state_path: Path | None = None):
+        self.path = path
+        self.version = version
+        self.state_path = state_path if path else None
+        self.fingerprint = f"{SEARCH_FINGERPRINT}:{version or ''}"
+        self.previous: dict[str, dict] = {}
+        self.pages: dict[str, dict] = {}
+        if self.state_path and self.state_path.is_file():
+            try:
+                data = json.loads(self.state_path.read_text(encoding="utf-8"))
+            except json.JSONDecodeError:
+                logger.warning(f"Ignoring corrupted search index state {self.state_path}")
+                return
+            if data.get("fingerprint") == self.fingerprint:
+                self.previous = data["pages"]
+
+    def add(self, key: str, input_hash: str, page: Page) -> None:
+        if not self.path:
+            return
+        entry = self.previous.get(key)
+        if not entry or entry["input"] != input_hash:
+            entry = {"input": input_hash, **extract_entries(page, self.version)}
+        self.pages[key] = entry
+
+    def keep(self, key: str) -> None:
+        if key in self.previous:
+            self.pages[key] = self.previous[key]
+
+    def build_shard(self, keys: list[str]) -> dict:
+        pages, docs, terms = [], [], defaultdict(list)
+        for key in keys:
+            entry = self.pages[key]
+            offset = len(docs)
+            docs.extend([len(pages), *doc] for doc in entry["docs"])
+            pages.append([entry["url"], entry["title"]])
+            for term, postings in entry["terms"].items():
+                terms[term].extend([doc + offset, score] for doc, score in postings)
+        for postings in terms.values():
+            postings.sort(key=lambda posting: -posting[1])
+        # The client binary searches the terms, so they are ordered the way JS compares strings, by UTF-16 code unit.
+        ordered = sorted(terms, key=lambda term: term.encode("utf-16-be"))
+        return {"pages": pages, "docs": docs, "terms": ordered, "postings": [terms[term] for term in ordered]}
+
+    def save(self) -> None:
+        if not self.path:
+            return
+        sections = shard_sections(sorted(self.pages))
+        written = 0
+        shards = {}
+        for section, keys in sorted(sections.items()):
+            shard = self.build_shard(keys)
+            file = f"{section}.json"
+            written += bool(write_if_changed(self.path / file, json.dumps(shard, ensure_ascii=False, separators=(",", ":"))))
+            prefixes = sorted({term[:PREFIX_LENGTH] for term in shard["terms"]})
+            shards[section] = {"file": file, "docs": len(shard["docs"]), "terms": len(shard["terms"]), "prefixes": prefixes}
+        write_if_changed(self.path / SHARDS_FILE, json.dumps({"version": self.version, "stop_words": sorted(STOP_WORDS), "shards": shards}, ensure_ascii=False, separators=(",", ":")) + "\n")
+        for stale in self.path.glob("*.json"):
+            if stale.stem not in shards and stale.name not in (SHARDS_FILE, VERSIONS_FILE):
+                stale.unlink()
+        if self.state_path:
+            write_if_changed(self.state_path, json.dumps({"fingerprint": self.fingerprint, "pages": self.pages}, ensure_ascii=False))
+        logger.info(f"Search index: {len(shards)} shards, {written} rewritten, {sum(s['docs'] for s in shards.values())} entries")
+
+
+def write_versions(path: Path) -> list[str]:
+    # Versioned indexes live in <path>/<version>, the client looks up the one matching the page it is on.
+    versions = sorted(child.name for child in path.iterdir() if (child / SHARDS_FILE).is_file()) if path.is_dir() else []
+    write_if_changed(path / VERSIONS_FILE, json.dumps(versions) + "\n")
+    return versions
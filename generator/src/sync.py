@@ -0,0 +1,118 @@
+import ctypes
+import hashlib
+import os
+import shutil
+from pathlib import Path
+from loguru import logger
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+FICLONE = 0x40049409
+AT_FDCWD = -100
+RENAME_EXCHANGE = 2
+
+try:
+    RENAMEAT2 = ctypes.CDLL(None, use_errno=True).renameat2
+except (OSError, AttributeError, TypeError):
+    RENAMEAT2 = None
+
+
+def hash_file(path: Path) -> str:
+    with path.open("rb") as file:
+        return hashlib.file_digest(file, "sha256").hexdigest()
+
+
+def same_content(source: Path, target: Path) -> bool:
+    source_stat, target_stat = source.stat(), target.stat()
+    if (source_stat.st_dev, source_stat.st_ino) == (target_stat.st_dev, target_stat.st_ino):
+        return True
+    if source_stat.st_size != target_stat.st_size:
+        return False
+    return hash_file(source) == hash_file(target)
+
+
+def clone_file(source: Path, target: Path) -> str:
+    if fcntl is not None:
+        try:
+            with source.open("rb") as src, target.open("wb") as dst:
+                fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+            return "reflinked"
+        except OSError:
+            target.unlink(missing_ok=True)
+    try:
+        os.link(source, target)
+        return "linked"
+    except OSError:
+        shutil.copyfile(source, target)
+        return "copied"
+
+
+def exchange(first: Path, second: Path) -> bool:
+    if RENAMEAT2 is None:
+        return False
+    return RENAMEAT2(AT_FDCWD, os.fsencode(first), AT_FDCWD, os.fsencode(second), RENAME_EXCHANGE) == 0
+
+
+def swap_directories(staging: Path, target: Path) -> None:
+    if not target.exists():
+        os.rename(staging, target)
+        return
+    if exchange(staging, target):
+        shutil.rmtree(staging)
+        return
+    # Without renameat2 the target is missing for the moment between the two renames.
+    previous = target.with_name(f".{target.name}.old")
+    shutil.rmtree(previous, ignore_errors=True)
+    os.rename(target, previous)
+    os.rename(staging, target)
+    shutil.rmtree(previous)
+
+
+def list_files(root: Path) -> dict[str, Path]:
+    if not root.is_dir():
+        return {}
+    # Dotted entries are staging and scratch trees, including ones left behind by an interrupted run.
+    files = {}
+    for file in sorted(root.rglob("*")):
+        name = file.relative_to(root)
+        if file.is_file() and not any(part.startswith(".") for part in name.parts):
+            files[name.as_posix()] = file
+    return files
+
+
+def sync_tree(sources: dict[str, Path], target: Path, link: bool = False) -> dict[str, int]:
+    # sources maps a prefix inside target ("" for its root) to the directory mirrored there.
+    wanted: dict[str, Path] = {}
+    for prefix, source in sources.items():
+        for name, file in list_files(source).items():
+            wanted[f"{prefix}/{name}" if prefix else name] = file
+    existing = list_files(target)
+
+    changed = {name for name, file in wanted.items() if name not in existing or not same_content(file, existing[name])}
+    stale = existing.keys() - wanted.keys()
+    stats = {"unchanged": len(wanted) - len(changed), "removed": len(stale), "copied": 0, "linked": 0, "reflinked": 0}
+    if not changed and not stale:
+        logger.info(f"{target} is up to date, {len(wanted)} files unchanged")
+        return stats
+
+    # Unchanged files are hard links to the current ones in the staging tree, so they keep their inode and mtime.
+    staging = target.with_name(f".{target.name}.sync")
+    shutil.rmtree(staging, ignore_errors=True)
+    for name, file in wanted.items():
+        staged = staging / name
+        staged.parent.mkdir(parents=True, exist_ok=True)
+        if name not in changed:
+            os.link(existing[name], staged)
+        elif link:
+            stats[clone_file(file, staged)] += 1
+        else:
+            shutil.copyfile(file, staged)
+            stats["copied"] += 1
+    staging.mkdir(parents=True, exist_ok=True)
+    swap_directories(staging, target)
+    logger.success(f"Synced {target}: {len(changed)} updated ({stats['copied']} copied, {stats['linked']} linked, {stats['reflinked']} reflinked), "
+                   f"{stats['unchanged']} unchanged, {stats['removed']} removed")
+    return stats
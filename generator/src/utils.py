@@ -1,8 +1,13 @@
+import re
 import subprocess
+import time
 from pathlib import Path
 from git import Optional, RemoteProgress
+from loguru import logger
 from rich.progress import Progress, TextColumn, BarColumn, FileSizeColumn, TransferSpeedColumn, TimeRemainingColumn, SpinnerColumn
 
+ANSI_ESCAPE = re.compile(r"\x1b\[[0-9;]*[A-Za-z]")
+
 class RichCloneProgress(RemoteProgress):
     def __init__(self):
         super().__init__()
@@ -45,14 +50,18 @@ class RichCloneProgress(RemoteProgress):
         if hasattr(self, 'progress'):
             self.progress.stop()
 
-def run_process_with_progress(cmd: list[str], description: str, cwd: Optional[Path | str] = None) -> int:
+def run_process_with_progress(cmd: list[str], description: str, cwd: Optional[Path | str] = None, env: Optional[dict] = None) -> int:
+    # Cargo's "Finished" line ends the compile phase, whatever the process prints afterwards is the run phase.
+    start = time.perf_counter()
+    compiled = None
     with subprocess.Popen(
         cmd, 
         stdout=subprocess.PIPE, 
         stderr=subprocess.STDOUT, 
         text=True, 
         bufsize=1,
-        cwd=cwd
+        cwd=cwd,
+        env=env
     ) as process:
         with Progress(
             SpinnerColumn(),
@@ -65,9 +74,17 @@ def run_process_with_progress(cmd: list[str], description: str, cwd: Optional[Pa
                 return process.returncode
             for line in stdout:
                 line = line.strip()
+                status = ANSI_ESCAPE.sub("", line).strip()
                 if line:
-                    if line.startswith("Compiling") or line.startswith("Finished"):
+                    if status.startswith("Compiling") or status.startswith("Finished"):
                         progress.console.print(line)
+                        if status.startswith("Finished") and compiled is None:
+                            compiled = time.perf_counter()
                     else:
-                        progress.update(task, description=f"{line[:60]}...")
+                        progress.update(task, description=f"{status[:60]}...")
+    finished = time.perf_counter()
+    if compiled is None:
+        logger.info(f"{description} took {finished - start:.1f}s")
+    else:
+        logger.info(f"{description}: compile phase {compiled - start:.1f}s, run phase {finished - compiled:.1f}s")
     return process.returncode
\ No newline at end of file
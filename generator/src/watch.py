@@ -0,0 +1,62 @@
+import importlib
+import sys
+import time
+from pathlib import Path
+from typing import Callable
+from loguru import logger
+
+WATCH_INTERVAL = 0.2
+# Reloaded in dependency order, so every module picks up the fresh version of the ones it imports. Only these files
+# are watched: src.metrics keeps the counters main reports, the rest of src only serves the initial build.
+CONVERTER_MODULES = (
+    "src.manifest", "src.route_filter", "src.sync", "src.output_writer", "src.schema", "src.html_tree", "src.escaping",
+    "src.fragment_cache", "src.html_to_mdx", "src.partials", "src.mdx_writer", "src.search_index", "src.assets",
+    "src.page_split", "src.mdx_converter",
+)
+
+
+def snapshot(paths: list[Path]) -> dict[Path, tuple[float, int]]:
+    files = {}
+    for path in paths:
+        candidates = path.rglob("*") if path.is_dir() else [path]
+        for file in candidates:
+            try:
+                stat = file.stat()
+            except FileNotFoundError:
+                continue
+            if file.is_file() and not file.name.startswith("."):
+                files[file] = (stat.st_mtime, stat.st_size)
+    return files
+
+
+def converter_sources(src_dir: Path) -> list[Path]:
+    return [src_dir / f"{name.removeprefix('src.')}.py" for name in CONVERTER_MODULES]
+
+
+def reload_converter() -> None:
+    for name in CONVERTER_MODULES:
+        if name in sys.modules:
+            importlib.reload(sys.modules[name])
+
+
+def watch(groups: dict[str, list[Path]], on_change: Callable[[set[str]], None], interval: float = WATCH_INTERVAL) -> None:
+    states = {group: snapshot(paths) for group, paths in groups.items()}
+    logger.info(f"Watching {', '.join(str(path) for paths in groups.values() for path in paths)}, press Ctrl+C to stop")
+    try:
+        while True:
+            time.sleep(interval)
+            changed = set()
+            for group, paths in groups.items():
+                current = snapshot(paths)
+                if current != states[group]:
+                    states[group] = current
+                    changed.add(group)
+            if not changed:
+                continue
+            try:
+                on_change(changed)
+            except Exception:
+                # Keep watching, the next edit will most likely fix it.
+                logger.exception(f"Update after changes to {', '.join(sorted(changed))} failed")
+    except KeyboardInterrupt:
+        logger.info("Stopped watching")
@@ -0,0 +1,61 @@
+import json
+import random
+import re
+from pathlib import Path
+
+import pytest
+from src import escaping
+from src.html_tree import parse_fragment
+from src.legacy_escaping import LEGACY
+
+CONTEXTS = ("mdx_text", "code_span", "table_cell", "js_string", "template_literal", "jsx_attribute", "quoted_string")
+# Contexts whose target language reads a backslash as escaping the next character.
+BACKSLASH_CONTEXTS = ("mdx_text", "table_cell", "js_string", "template_literal", "quoted_string")
+BACKSLASH_ESCAPE = re.compile(r"\\(.)", re.DOTALL)
+SAMPLES = 20_000
+FRAGMENTS = Path(__file__).with_name("fixtures") / "fragments.json"
+
+
+def unescaper(context: str):
+    replacements = getattr(escaping, context.upper())
+    if context in BACKSLASH_CONTEXTS:
+        return lambda text: BACKSLASH_ESCAPE.sub(lambda match: match[1], text)
+    # Replacements to a single character (newlines to spaces) lose information and are left out.
+    reverse = {replacement: char for char, replacement in replacements.items() if len(replacement) > 1}
+    pattern = re.compile("|".join(re.escape(replacement) for replacement in sorted(reverse, key=len, reverse=True)))
+    return lambda text: pattern.sub(lambda match: reverse[match[0]], text)
+
+
+def random_strings(context: str) -> list[str]:
+    replacements = getattr(escaping, context.upper())
+    # Escaped forms are part of the alphabet, input that already looks escaped must survive as well.
+    alphabet = list(replacements) + list(replacements.values()) + list("ab &;\\\n")
+    rng = random.Random(context)
+    return ["".join(rng.choices(alphabet, k=rng.randint(0, 12))) for _ in range(SAMPLES)]
+
+
+def fragment_strings() -> list[str]:
+    # Text nodes of the recorded fragments, the way html_to_mdx sees them.
+    strings = []
+    for fragment in json.loads(FRAGMENTS.read_text())["fragments"]:
+        strings.extend(parse_fragment(fragment["html"]).get_text("\0").split("\0"))
+    return strings
+
+
+@pytest.mark.parametrize("context", CONTEXTS)
+def test_round_trip(context):
+    escape, unescape = getattr(escaping, context), unescaper(context)
+    lossy = [char for char, replacement in getattr(escaping, context.upper()).items() if len(replacement) == 1]
+    failures = [text for text in random_strings(context) if not any(char in text for char in lossy) and unescape(escape(text)) != text]
+    assert failures == []
+
+
+@pytest.mark.parametrize("context", LEGACY)
+def test_legacy_parity(context):
+    escape, legacy = getattr(escaping, context), LEGACY[context]
+    strings = random_strings(context) + fragment_strings()
+    # The legacy table cell escaping only handled single character symbols.
+    if context == "table_cell":
+        strings = [text for text in strings if len(text) == 1] + list(escaping.TABLE_CELL)
+    mismatches = [text for text in strings if escape(text) != legacy(text)]
+    assert mismatches == []
@@ -0,0 +1,51 @@
+import json
+from pathlib import Path
+
+import pytest
+from src import html_to_mdx
+from src.html_to_mdx import HIGHLIGHT_MODES, PARSER_BACKENDS, configure, convert_fragment, convert_html
+
+# Recorded with html.parser, every backend has to reproduce it. After adding a fragment or changing the output on
+# purpose, re-record with `PYTHONPATH=. python tests/test_html_to_mdx.py` and review the diff.
+GOLDEN = Path(__file__).with_name("fixtures") / "fragments.json"
+RECORDED = json.loads(GOLDEN.read_text())
+
+
+@pytest.fixture(autouse=True)
+def restore_options():
+    options = dict(html_to_mdx.OPTIONS)
+    yield
+    configure(options)
+
+
+def render(html: str, parser: str, highlight: str) -> dict:
+    configure({"parser": parser, "highlight": highlight})
+    mdx, components = convert_fragment(html, RECORDED["images"], RECORDED["links"])
+    return {"mdx": mdx, "components": list(components)}
+
+
+@pytest.mark.parametrize("highlight", HIGHLIGHT_MODES)
+@pytest.mark.parametrize("parser", PARSER_BACKENDS)
+@pytest.mark.parametrize("fragment", RECORDED["fragments"], ids=lambda fragment: fragment["name"])
+def test_golden_fragments(fragment, parser, highlight):
+    if parser == "lxml":
+        pytest.importorskip("lxml")
+    assert render(fragment["html"], parser, highlight) == fragment["expected"][highlight]
+
+
+@pytest.mark.parametrize("parser", PARSER_BACKENDS)
+def test_unknown_references_are_kept(parser):
+    if parser == "lxml":
+        pytest.importorskip("lxml")
+    mdx = render('<p title="&notin;">&notanentity; &ampx; &copy;</p><a href="/x/?a&notreal;">l</a>', parser, "shiki")["mdx"]
+    assert mdx == "\\&notanentity; \\&ampx; ©\n\n[l](/docs/x/?a&notreal;)"
+
+
+def test_convert_html_without_fragment_state():
+    assert convert_html('<p><img src="/assets/a.png"> <a href="/x/#y">x</a></p>') == '<img src="/assets/a.png" alt="" /> [x](/docs/x/#y)'
+
+
+if __name__ == "__main__":
+    for fragment in RECORDED["fragments"]:
+        fragment["expected"] = {highlight: render(fragment["html"], "html.parser", highlight) for highlight in HIGHLIGHT_MODES}
+    GOLDEN.write_text(json.dumps(RECORDED, indent=2, ensure_ascii=False) + "\n")
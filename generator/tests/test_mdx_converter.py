@@ -0,0 +1,73 @@
+import json
+from pathlib import Path
+
+import pytest
+from src import html_to_mdx, mdx_converter
+from src.fragment_cache import FragmentCache
+from src.mdx_converter import convert_shared_fragments, generate_mdx_docs, load_pages, stream_pages
+from src.metrics import METRICS
+from src.schema import SchemaError
+
+FIXTURE_JSON = Path(__file__).parents[1] / "bench" / "fixtures" / "output.json"
+
+
+def test_streaming_matches_load_pages():
+    pytest.importorskip("ijson")
+    loaded = {page.route: page for page in load_pages(FIXTURE_JSON)}
+    streamed = {page.route: page for page in stream_pages(FIXTURE_JSON)}
+    assert streamed == loaded
+    root = loaded[""]
+    assert root.has_children and root.children_order == ["tutorial", "reference"]
+
+
+@pytest.mark.parametrize("route", [None, 3, "reference"])
+@pytest.mark.parametrize("loader", [load_pages, stream_pages], ids=["load", "stream"])
+def test_invalid_child_routes_name_the_page(tmp_path, loader, route):
+    if loader is stream_pages:
+        pytest.importorskip("ijson")
+    data = json.loads(FIXTURE_JSON.read_text())
+    parent = next(page for page in data if page.get("children"))
+    parent["children"][0]["route"] = route
+    input_json = tmp_path / "output.json"
+    input_json.write_text(json.dumps(data))
+    with pytest.raises(SchemaError, match=rf"^page {parent['route'].strip('/')}: children\[0\]\.route: expected"):
+        list(loader(input_json))
+
+
+def test_streaming_rewrites_forward_links_in_one_pass(tmp_path, monkeypatch):
+    pytest.importorskip("ijson")
+    data = json.loads(FIXTURE_JSON.read_text())
+    data[0]["body"]["content"] = '<p>See <a href="/reference/sec0/f3/#definitions-m1">m1</a>.</p>'
+    input_json = tmp_path / "output.json"
+    input_json.write_text(json.dumps(data))
+    reads = []
+    monkeypatch.setattr(mdx_converter, "stream_pages", lambda *args: reads.append(args) or stream_pages(*args))
+    generate_mdx_docs(input_json, tmp_path / "docs", streaming=True, page_budget=2000)
+    assert len(reads) == 1
+    assert "[m1](/docs/reference/sec0/f3/m1/)" in (tmp_path / "docs" / "index.mdx").read_text()
+
+
+def test_fragments_shared_between_versions_are_converted_once(tmp_path, monkeypatch):
+    monkeypatch.setattr(html_to_mdx, "FRAGMENT_CACHE", FragmentCache())
+    data = json.loads(FIXTURE_JSON.read_text())
+    builds = []
+    for version, content in (("v1", "<p>First</p>"), ("v2", "<p>Second</p>")):
+        data[0]["body"]["content"] = content
+        input_json = tmp_path / f"{version}.json"
+        input_json.write_text(json.dumps(data))
+        builds.append({"version": version, "input_json": input_json, "output_path": tmp_path / version, "manifest_path": None, "assets": None, "images": None})
+    shared = convert_shared_fragments(builds)
+    assert shared and all(html_to_mdx.FRAGMENT_CACHE.entries[key] == value for key, value in shared.items())
+    html_to_mdx.FRAGMENT_CACHE.export_delta()
+    for build in builds:
+        generate_mdx_docs(build["input_json"], build["output_path"], version=build["version"])
+        # Only the page content that differs is converted again.
+        assert html_to_mdx.FRAGMENT_CACHE.export_delta()["misses"] == 1
+
+
+def test_fragment_cache_counters_are_reported_per_run(tmp_path, monkeypatch):
+    monkeypatch.setattr(html_to_mdx, "FRAGMENT_CACHE", FragmentCache())
+    generate_mdx_docs(FIXTURE_JSON, tmp_path / "first")
+    METRICS.reset()
+    generate_mdx_docs(FIXTURE_JSON, tmp_path / "second")
+    assert METRICS.counters["fragment_cache_misses"] == 0 and METRICS.counters["fragment_cache_hits"] > 0
@@ -0,0 +1,31 @@
+import json
+from pathlib import Path
+
+from src import search_index
+from src.search_index import SHARDS_FILE, STOP_WORDS, SearchIndex, shard_sections
+from src.mdx_converter import load_pages
+
+FIXTURE_JSON = Path(__file__).parents[1] / "bench" / "fixtures" / "output.json"
+
+
+def test_large_sections_are_split_by_second_segment(monkeypatch):
+    monkeypatch.setattr(search_index, "SHARD_MAX_PAGES", 2)
+    keys = ["", "reference", "reference/text", "reference/text/raw", "reference/math/frac", "tutorial/writing"]
+    assert shard_sections(keys) == {
+        "index": [""],
+        "reference": ["reference"],
+        "reference+text": ["reference/text", "reference/text/raw"],
+        "reference+math": ["reference/math/frac"],
+        "tutorial": ["tutorial/writing"],
+    }
+
+
+def test_manifest_lists_stop_words(tmp_path):
+    index = SearchIndex(tmp_path)
+    for page in load_pages(FIXTURE_JSON):
+        index.add(page.route, "", page)
+    index.save()
+    manifest = json.loads((tmp_path / SHARDS_FILE).read_text())
+    assert manifest["stop_words"] == sorted(STOP_WORDS)
+    shard = json.loads((tmp_path / manifest["shards"]["reference"]["file"]).read_text())
+    assert not STOP_WORDS & set(shard["terms"])
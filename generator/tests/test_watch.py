@@ -0,0 +1,23 @@
+import ast
+from pathlib import Path
+
+from src.watch import CONVERTER_MODULES, converter_sources
+
+SRC_DIR = Path(__file__).parents[1] / "src"
+
+
+def imported_modules(path: Path) -> set[str]:
+    imports = set()
+    for node in ast.walk(ast.parse(path.read_text())):
+        if isinstance(node, ast.ImportFrom) and node.module == "src":
+            imports.update(f"src.{alias.name}" for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module and node.module.startswith("src."):
+            imports.add(node.module)
+    return imports
+
+
+def test_converter_modules_reload_after_their_imports():
+    for index, path in enumerate(converter_sources(SRC_DIR)):
+        # src.metrics is kept across reloads on purpose, main holds its counters.
+        imports = imported_modules(path) - {"src.metrics"}
+        assert imports <= set(CONVERTER_MODULES[:index]), CONVERTER_MODULES[index]
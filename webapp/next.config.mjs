@@ -2,10 +2,15 @@ import { createMDX } from 'fumadocs-mdx/next';
 
 const withMDX = createMDX();
 
+const basePath = process.env.NODE_ENV === "production" ? "/typst-fumadocs" : "";
+
 /** @type {import('next').NextConfig} */
 const config = {
   output: "export",
-  basePath: process.env.NODE_ENV === "production" ? "/typst-fumadocs" : "",
+  basePath,
+  env: {
+    NEXT_PUBLIC_BASE_PATH: basePath,
+  },
   trailingSlash: true,
   images: {
     unoptimized: true,
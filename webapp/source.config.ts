@@ -10,12 +10,16 @@ export const docs = defineDocs({
   dir: 'content/docs',
   docs: {
     schema: frontmatterSchema,
+    // Shared partials are imported by pages, they are not pages themselves.
+    files: ['**/*.mdx', '!**/_partials/**'],
     postprocess: {
       includeProcessedMarkdown: true,
     },
   },
   meta: {
     schema: metaSchema,
+    // Pages may import TypeTable data from *.types.json sidecars, those are not meta files.
+    files: ['**/meta.json'],
   },
 });
 
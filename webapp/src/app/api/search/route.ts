@@ -1,13 +1,21 @@
+import { existsSync } from 'node:fs';
+import { join } from 'node:path';
 import { source } from '@/lib/source';
 import { createSearchAPI } from 'fumadocs-core/search/server';
 
 export const dynamic = 'force-static';
 
+// Fallback for deployments without the generator's prebuilt index in public/search, see lib/search/prebuilt.ts.
+// When the prebuilt index is present the exported index stays empty, so the build does not index every page.
+const hasPrebuiltIndex = existsSync(join(process.cwd(), 'public', 'search', 'manifest.json'));
+
 export const { staticGET: GET } = createSearchAPI('advanced', {
-  indexes: source.getPages().map((page) => ({
-    title: page.data.title,
-    structuredData: page.data.structuredData,
-    id: page.url,
-    url: page.url,
-  })),
-});
\ No newline at end of file
+  indexes: hasPrebuiltIndex
+    ? []
+    : source.getPages().map((page) => ({
+        title: page.data.title,
+        structuredData: page.data.structuredData,
+        id: page.url,
+        url: page.url,
+      })),
+});
@@ -0,0 +1,77 @@
+"use client"
+
+import { useEffect, useState } from "react"
+import { usePathname } from "next/navigation"
+import type { SortedResult } from "fumadocs-core/search"
+import {
+  SearchDialog,
+  SearchDialogClose,
+  SearchDialogContent,
+  SearchDialogHeader,
+  SearchDialogIcon,
+  SearchDialogInput,
+  SearchDialogList,
+  SearchDialogOverlay,
+  type SharedProps,
+} from "fumadocs-ui/components/dialog/search"
+import DefaultSearchDialog from "fumadocs-ui/components/dialog/search-default"
+import { hasPrebuiltIndex, searchPrebuilt } from "@/lib/search/prebuilt"
+
+const FALLBACK_API = `${process.env.NEXT_PUBLIC_BASE_PATH ?? ""}/api/search`
+
+export default function PrebuiltSearchDialog(props: SharedProps) {
+  const [search, setSearch] = useState("")
+  const [results, setResults] = useState<SortedResult[] | null>(null)
+  const [isLoading, setIsLoading] = useState(false)
+  const [prebuilt, setPrebuilt] = useState(true)
+  const pathname = usePathname()
+
+  useEffect(() => {
+    if (!props.open) return
+    let cancelled = false
+    hasPrebuiltIndex(pathname).then((available) => {
+      if (!cancelled) setPrebuilt(available)
+    })
+    return () => {
+      cancelled = true
+    }
+  }, [props.open, pathname])
+
+  useEffect(() => {
+    if (!search || !prebuilt) {
+      setResults(null)
+      return
+    }
+    let cancelled = false
+    setIsLoading(true)
+    searchPrebuilt(search, pathname)
+      .then((items) => {
+        if (!cancelled) setResults(items)
+      })
+      .catch((error: unknown) => console.error("Search failed:", error))
+      .finally(() => {
+        if (!cancelled) setIsLoading(false)
+      })
+    return () => {
+      cancelled = true
+    }
+  }, [search, prebuilt, pathname])
+
+  if (!prebuilt) {
+    return <DefaultSearchDialog type="static" api={FALLBACK_API} {...props} />
+  }
+
+  return (
+    <SearchDialog search={search} onSearchChange={setSearch} isLoading={isLoading} {...props}>
+      <SearchDialogOverlay />
+      <SearchDialogContent>
+        <SearchDialogHeader>
+          <SearchDialogIcon />
+          <SearchDialogInput />
+          <SearchDialogClose />
+        </SearchDialogHeader>
+        <SearchDialogList items={results} />
+      </SearchDialogContent>
+    </SearchDialog>
+  )
+}
@@ -0,0 +1,55 @@
+import { Fragment, type ReactNode } from "react"
+import { twMerge } from "tailwind-merge"
+import { CodeBlock, Pre } from "@/components/fumadocs/codeblock"
+
+// Text and the typst-docs highlight scopes (the class names without their "typ-" prefix) it was tagged with.
+export type TypstToken = [text: string, scope?: string]
+
+interface TypstCodeProps {
+  tokens: TypstToken[]
+  inline?: boolean
+  wordWrap?: boolean
+  className?: string
+}
+
+function splitLines(tokens: TypstToken[]): TypstToken[][] {
+  const lines: TypstToken[][] = [[]]
+  for (const [text, scope] of tokens) {
+    text.split("\n").forEach((part, index) => {
+      if (index > 0) {
+        lines.push([])
+      }
+      if (part) {
+        lines[lines.length - 1].push([part, scope])
+      }
+    })
+  }
+  return lines
+}
+
+function renderToken([text, scope]: TypstToken, key: number): ReactNode {
+  if (!scope) {
+    return <Fragment key={key}>{text}</Fragment>
+  }
+  const className = scope.split(" ").map((name) => `typ-${name}`).join(" ")
+  return <span key={key} className={className}>{text}</span>
+}
+
+export function TypstCode({ tokens, inline = false, wordWrap = false, className }: TypstCodeProps) {
+  if (inline) {
+    return <code className={twMerge("typst-code", className)}>{tokens.map(renderToken)}</code>
+  }
+
+  return (
+    <CodeBlock wordWrap={wordWrap} className={className}>
+      <Pre>
+        <code className="typst-code">
+          {splitLines(tokens).map((line, index) => (
+            // Blank lines keep a space so they do not collapse in the flex column.
+            <span key={index} className="line">{line.length ? line.map(renderToken) : " "}</span>
+          ))}
+        </code>
+      </Pre>
+    </CodeBlock>
+  )
+}
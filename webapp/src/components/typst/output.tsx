@@ -15,6 +15,10 @@ interface TypstOutputProps {
   imageError: boolean
   onImageError: () => void
   layout?: "horizontal" | "vertical"
+  width?: number
+  height?: number
+  placeholder?: string
+  hash?: string
 }
 
 export function TypstOutput({
@@ -25,6 +29,10 @@ export function TypstOutput({
   imageError,
   onImageError,
   layout = "horizontal",
+  width = 800,
+  height = 600,
+  placeholder,
+  hash,
 }: TypstOutputProps) {
   const [imageLoading, setImageLoading] = useState(true)
   const [svgLoading, setSvgLoading] = useState(true)
@@ -75,10 +83,14 @@ export function TypstOutput({
         />
       ) : imagePath && !imageError ? (
         <Image
+          key={hash}
           src={imagePath}
           alt={alt}
-          width={800}
-          height={600}
+          width={width}
+          height={height}
+          loading="lazy"
+          placeholder={placeholder ? "blur" : "empty"}
+          blurDataURL={placeholder}
           className={twMerge(
             "w-full h-auto object mt-0 mb-0 transition-opacity duration-200",
             imageLoading ? "opacity-0" : "opacity-100"
@@ -7,12 +7,14 @@ import stripIndent from 'strip-indent';
 import { TypstEditor } from "./editor"
 import { TypstOutput } from "./output"
 import { DynamicCodeBlock } from "@/components/fumadocs/dynamic-codeblock"
+import { TypstCode, type TypstToken } from "./code"
 import { formatTypstError, parseTypstError } from "@/lib/typst/error-parser"
 import { DEFAULT_HIDDEN_PREFIX, DEFAULT_HIDDEN_SUFFIX } from "@/lib/typst/constants"
 import { LoadingSpinner } from "@/components/ui/spinner"
 
 interface TypstPreviewProps {
   code: string
+  tokens?: TypstToken[]
   image: string
   alt?: string
   layout?: "horizontal" | "vertical"
@@ -20,6 +22,10 @@ interface TypstPreviewProps {
   editable?: boolean
   hiddenPrefix?: string | null
   hiddenSuffix?: string | null
+  width?: number
+  height?: number
+  placeholder?: string
+  hash?: string
 }
 
 function buildFullCode(
@@ -34,6 +40,7 @@ function buildFullCode(
 
 export function TypstPreview({
   code,
+  tokens,
   image,
   alt = "Preview",
   layout = "horizontal",
@@ -41,31 +48,48 @@ export function TypstPreview({
   editable = true,
   hiddenPrefix = DEFAULT_HIDDEN_PREFIX,
   hiddenSuffix = DEFAULT_HIDDEN_SUFFIX,
+  width,
+  height,
+  placeholder,
+  hash,
 }: TypstPreviewProps) {
   const [imageError, setImageError] = useState(false)
+  const [useFallback, setUseFallback] = useState(false)
   const [compiledSvg, setCompiledSvg] = useState<string | null>(null)
   const [localCompileError, setLocalCompileError] = useState<string | null>(null)
   const [initialCompileDone, setInitialCompileDone] = useState(false)
+  // The compiler is only loaded once the reader interacts with the preview.
+  const [activated, setActivated] = useState(false)
 
   const {
     compile,
     isLoading: compilerLoading,
     compilerInitError,
     compileError: hookCompileError
-  } = useTypstCompiler()
+  } = useTypstCompiler(editable && activated)
 
   const displayCode = useMemo(() => {
     return stripIndent(code.trim());
   }, [code])
 
   const imagePath = useMemo(() => {
-    if (image.startsWith("/")) {
-      return image
+    // Transcoded assets keep a PNG next to them under the same content hash.
+    const source = useFallback ? image.replace(/\.(webp|avif)$/, ".png") : image
+    if (source.startsWith("/")) {
+      return source
     }
-    return `/assets/${image}`
-  }, [image])
+    return `/assets/${source}`
+  }, [image, useFallback])
 
-  const isEditable = editable && !compilerLoading && !compilerInitError && !!compile
+  const handleImageError = useCallback(() => {
+    if (!useFallback && /\.(webp|avif)$/.test(image)) {
+      setUseFallback(true)
+      return
+    }
+    setImageError(true)
+  }, [image, useFallback])
+
+  const isEditable = editable && activated && !compilerLoading && !compilerInitError && !!compile
 
   const compileCode = useCallback(
     async (codeToCompile: string) => {
@@ -133,47 +157,61 @@ export function TypstPreview({
 
   const displayCompileError = localCompileError || hookCompileError
 
-  const showCompilerLoading = editable && compilerLoading
+  const showCompilerLoading = editable && activated && compilerLoading
+
+  const activate = useCallback(() => setActivated(true), [])
 
   return (
-    <div className="typst-render-container my-6">
-      {showCompilerLoading ? (
-        <div className="flex items-center justify-center p-12 bg-fd-card border rounded-lg">
-          <LoadingSpinner />
-          <span className="ml-3 text-fd-muted-foreground">Loading compiler...</span>
+    <div
+      className="typst-render-container my-6"
+      onPointerEnter={editable ? activate : undefined}
+      onFocusCapture={editable ? activate : undefined}
+    >
+      <div className={containerClass}>
+        <div className={`${codeBlockClass} relative`}>
+          {showCompilerLoading && (
+            <div
+              role="status"
+              className="absolute inset-0 z-10 flex items-center justify-center rounded-lg bg-fd-card/80 backdrop-blur-sm"
+            >
+              <LoadingSpinner />
+              <span className="ml-3 text-fd-muted-foreground">Loading compiler...</span>
+            </div>
+          )}
+          {isEditable ? (
+            <TypstEditor
+              code={displayCode}
+              onChange={handleEditorChange}
+              wordWrap={wordWrap}
+            />
+          ) : tokens ? (
+            <TypstCode tokens={tokens} wordWrap={wordWrap} className="h-full" />
+          ) : (
+            <DynamicCodeBlock
+              code={displayCode}
+              lang="typst"
+              wordWrap={wordWrap}
+              codeblock={{
+                className: "h-full"
+              }}
+            />
+          )}
         </div>
-      ) : (
-        <div className={containerClass}>
-          <div className={`${codeBlockClass}`}>
-            {isEditable ? (
-              <TypstEditor
-                code={displayCode}
-                onChange={handleEditorChange}
-                wordWrap={wordWrap}
-              />
-            ) : (
-              <DynamicCodeBlock
-                code={displayCode}
-                lang="typst"
-                wordWrap={wordWrap}
-                codeblock={{
-                  className: "h-full"
-                }}
-              />
-            )}
-          </div>
-
-          <TypstOutput
-            compiledSvg={compiledSvg}
-            imagePath={imagePath}
-            alt={alt}
-            compileError={displayCompileError}
-            imageError={imageError}
-            onImageError={() => setImageError(true)}
-            layout={layout}
-          />
-        </div>
-      )}
+
+        <TypstOutput
+          compiledSvg={compiledSvg}
+          imagePath={imagePath}
+          alt={alt}
+          compileError={displayCompileError}
+          imageError={imageError}
+          onImageError={handleImageError}
+          layout={layout}
+          width={width}
+          height={height}
+          placeholder={placeholder}
+          hash={hash}
+        />
+      </div>
     </div>
   )
 }
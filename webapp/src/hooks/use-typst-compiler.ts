@@ -7,7 +7,7 @@ type TypstModule = Window['$typst']
 
 let typstInitialized = false
 
-export function useTypstCompiler() {
+export function useTypstCompiler(enabled: boolean = true) {
   const [compiler, setCompiler] = useState<TypstModule>(undefined)
   const [isLoading, setIsLoading] = useState(true)
   const [compilerInitError, setCompilerInitError] = useState<string | null>(null)
@@ -15,7 +15,7 @@ export function useTypstCompiler() {
   const loadingRef = useRef(false)
 
   useEffect(() => {
-    if (loadingRef.current) return
+    if (!enabled || loadingRef.current) return
     loadingRef.current = true
 
     const initCompiler = async () => {
@@ -53,7 +53,7 @@ export function useTypstCompiler() {
     return () => {
       loadingRef.current = false
     }
-  }, [])
+  }, [enabled])
 
   const compile = useCallback(
     async (code: string): Promise<string | null> => {
@@ -0,0 +1,160 @@
+import type { SortedResult } from 'fumadocs-core/search';
+
+// Written by the generator (generator/src/search_index.py) into public/search.
+const SEARCH_URL = `${process.env.NEXT_PUBLIC_BASE_PATH ?? ''}/search`;
+const MAX_RESULTS = 20;
+const TOKEN = /\w[\w.-]*\w|\w/g;
+
+type ShardManifest = {
+  version: string | null;
+  // The generator leaves these out of the index, so they are dropped from queries as well.
+  stop_words: string[];
+  shards: Record<string, { file: string; docs: number; terms: number; prefixes: string[] }>;
+};
+
+type Shard = {
+  pages: [url: string, title: string][];
+  docs: [page: number, type: SortedResult['type'], content: string][];
+  // Sorted by the generator, postings[i] belongs to terms[i].
+  terms: string[];
+  postings: [doc: number, score: number][][];
+};
+
+type ShardEntry = { url: string; prefixes: Set<string> };
+type Manifest = { stopWords: Set<string>; entries: ShardEntry[] };
+
+// Must match PREFIX_LENGTH in the generator, prefixes are counted in code points like Python slices.
+const PREFIX_LENGTH = 2;
+
+let versions: Promise<string[]> | undefined;
+const manifests = new Map<string, Promise<Manifest>>();
+const shards = new Map<string, Promise<Shard>>();
+
+function fetchJson<T>(url: string): Promise<T> {
+  return fetch(url).then((res) => {
+    if (!res.ok) throw new Error(`Failed to fetch ${url}: ${res.status}`);
+    return res.json() as Promise<T>;
+  });
+}
+
+// Versioned builds write one index per version into search/<version>, listed in search/versions.json.
+async function versionOf(pathname: string): Promise<string | null> {
+  versions ??= fetchJson<string[]>(`${SEARCH_URL}/versions.json`).catch(() => []);
+  const segment = pathname.split('/').filter(Boolean)[1];
+  return segment && (await versions).includes(segment) ? segment : null;
+}
+
+function loadManifest(version: string | null): Promise<Manifest> {
+  const base = version ? `${SEARCH_URL}/${encodeURIComponent(version)}` : SEARCH_URL;
+  let manifest = manifests.get(base);
+  if (!manifest) {
+    manifest = fetchJson<ShardManifest>(`${base}/manifest.json`).then(({ stop_words, shards: sections }) => ({
+      stopWords: new Set(stop_words),
+      entries: Object.values(sections).map(({ file, prefixes }) => ({ url: `${base}/${file}`, prefixes: new Set(prefixes) })),
+    }));
+    manifests.set(base, manifest);
+  }
+  return manifest;
+}
+
+// Deployments built without the generator's output have no prebuilt index and use the api/search route instead.
+export async function hasPrebuiltIndex(pathname: string): Promise<boolean> {
+  return loadManifest(await versionOf(pathname)).then(
+    () => true,
+    () => false,
+  );
+}
+
+function loadShard(url: string): Promise<Shard> {
+  let shard = shards.get(url);
+  if (!shard) {
+    shard = fetchJson<Shard>(url);
+    shards.set(url, shard);
+  }
+  return shard;
+}
+
+// Results must match every token, so a shard is only fetched when it has terms starting like each of them.
+function mayMatch(entry: ShardEntry, tokens: string[]): boolean {
+  return tokens.every((token) => {
+    const prefix = Array.from(token).slice(0, PREFIX_LENGTH).join('');
+    if (entry.prefixes.has(prefix)) return true;
+    return prefix.length < PREFIX_LENGTH && [...entry.prefixes].some((candidate) => candidate.startsWith(prefix));
+  });
+}
+
+function tokenize(query: string, stopWords: Set<string>): string[] {
+  const tokens = query.toLowerCase().match(TOKEN) ?? [];
+  const kept = tokens.filter((token) => !stopWords.has(token));
+  // A lone stop word is usually the start of a longer term being typed ("in" for "int").
+  return kept.length > 0 ? kept : tokens.slice(-1);
+}
+
+function lowerBound(terms: string[], prefix: string): number {
+  let low = 0;
+  let high = terms.length;
+  while (low < high) {
+    const mid = (low + high) >> 1;
+    if (terms[mid] < prefix) low = mid + 1;
+    else high = mid;
+  }
+  return low;
+}
+
+function scoreShard(shard: Shard, tokens: string[]): Map<number, number> {
+  const { terms, postings } = shard;
+  const scores = new Map<number, number>();
+
+  tokens.forEach((token, index) => {
+    const matched = new Map<number, number>();
+    // Only the token being typed matches by prefix.
+    const prefix = index === tokens.length - 1;
+    for (let i = lowerBound(terms, token); i < terms.length; i++) {
+      const term = terms[i];
+      if (!term.startsWith(token) || (!prefix && term !== token)) break;
+      const boost = term === token ? 2 : 1;
+      for (const [doc, score] of postings[i]) {
+        matched.set(doc, Math.max(matched.get(doc) ?? 0, score * boost));
+      }
+    }
+    for (const [doc, score] of matched) {
+      if (index === 0) scores.set(doc, score);
+      else if (scores.has(doc)) scores.set(doc, scores.get(doc)! + score);
+    }
+    for (const doc of scores.keys()) {
+      if (!matched.has(doc)) scores.delete(doc);
+    }
+  });
+  return scores;
+}
+
+export async function searchPrebuilt(query: string, pathname: string): Promise<SortedResult[]> {
+  const { stopWords, entries } = await loadManifest(await versionOf(pathname));
+  const tokens = tokenize(query, stopWords);
+  if (tokens.length === 0) return [];
+
+  const loaded = await Promise.all(
+    entries.filter((entry) => mayMatch(entry, tokens)).map((entry) => loadShard(entry.url)),
+  );
+
+  const hits = loaded.flatMap((shard) =>
+    [...scoreShard(shard, tokens)].map(([doc, score]) => ({ shard, doc, score })),
+  );
+  hits.sort((a, b) => b.score - a.score);
+
+  const results: SortedResult[] = [];
+  const seenPages = new Set<string>();
+  for (const { shard, doc } of hits) {
+    if (results.length >= MAX_RESULTS) break;
+    const [page, type, content] = shard.docs[doc];
+    const [url, title] = shard.pages[page];
+    if (!seenPages.has(url)) {
+      seenPages.add(url);
+      results.push({ id: url, url, type: 'page', content: title });
+    }
+    if (type !== 'page') {
+      results.push({ id: `${url}:${doc}`, url, type, content });
+    }
+  }
+  return results;
+}
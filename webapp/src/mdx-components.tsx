@@ -2,9 +2,11 @@ import defaultMdxComponents from 'fumadocs-ui/mdx';
 import type { MDXComponents } from 'mdx/types';
 
 import { TypstPreview } from '@/components/typst/preview';
+import { TypstCode } from '@/components/typst/code';
 
 export const customComponents = {
   TypstPreview,
+  TypstCode,
 };
 
 export function getMDXComponents(components?: MDXComponents): MDXComponents {